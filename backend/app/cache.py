@@ -0,0 +1,144 @@
+"""
+Conditional GETs and an in-process response body cache.
+
+A cacheable response is keyed by a scope, e.g. ("recipes",) or
+("ingredients", user_id), plus a version read from the database:
+`table_version()` returns the number of matching rows and the sum of
+their row versions. Row versions only grow, so any insert, update or
+delete, by this process or any other (workers, the importer, seed_data),
+changes it. Recipes, a scope spanning the whole table, use two index-seek
+maxima instead (recipe_index.recipes_version_query). The ETag hashes the
+scope, that version and the query string, so a matching If-None-Match
+costs one index-only query and no rendering.
+Serialized bodies are also kept in a byte-bounded LRU keyed by ETag.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .pagination import NEXT_CURSOR_HEADER
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "no")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Headers worth replaying from a cached response
+_CACHED_HEADERS = ("content-type", NEXT_CURSOR_HEADER.lower())
+
+
+def table_version(model, *conditions):
+    """(row count, sum of row versions) of a model's matching rows, as a select()"""
+    return select(func.count(), func.coalesce(func.sum(model.row_version), 0)).where(*conditions)
+
+
+class ResponseCache:
+    """ETags from database versions plus an LRU of response bodies bounded by total size"""
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._bodies: "OrderedDict[str, Tuple[bytes, Dict[str, str]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def etag(self, scope: Tuple[Hashable, ...], version: tuple, request: Request) -> str:
+        key = f"{scope!r}|{version!r}|{request.url.path}?{request.url.query}"
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()[:24]}"'
+
+    def _get_body(self, etag: str):
+        with self._lock:
+            entry = self._bodies.get(etag)
+            if entry is not None:
+                self._bodies.move_to_end(etag)
+            return entry
+
+    def _put_body(self, etag: str, body: bytes, headers: Dict[str, str]):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if etag in self._bodies:
+                return
+            self._bodies[etag] = (body, headers)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._bodies.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    async def respond(
+        self,
+        request: Request,
+        db: AsyncSession,
+        scope: Tuple[Hashable, ...],
+        version,
+        build: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        """
+        Answer a GET from the cache when possible, otherwise call build()
+        and remember its body. `version` is a select() returning one row
+        that changes whenever the response would (see table_version); when
+        it returns none, build() runs uncached, e.g. to report a 404.
+        build() must return a fully rendered Response.
+        """
+        if not self.enabled:
+            return await build()
+        row = (await db.execute(version)).first()
+        if row is None:
+            return await build()
+
+        etag = self.etag(scope, tuple(row), request)
+        if etag in _parse_if_none_match(request.headers.get("if-none-match")):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+
+        cached = self._get_body(etag) if self.max_bytes > 0 else None
+        if cached is not None:
+            self.hits += 1
+            body, headers = cached
+            return Response(content=body, headers={**headers, "ETag": etag})
+
+        self.misses += 1
+        response = await build()
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+            if self.max_bytes > 0:
+                headers = {name: response.headers[name] for name in _CACHED_HEADERS if name in response.headers}
+                self._put_body(etag, bytes(response.body), headers)
+        return response
+
+    def clear(self):
+        """Forget every cached body"""
+        with self._lock:
+            self._bodies.clear()
+            self._size = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._bodies),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "not_modified": self.not_modified,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _parse_if_none_match(value: Optional[str]) -> set:
+    if not value:
+        return set()
+    return {tag.strip() for tag in value.split(",")}
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_ENABLED)
@@ -1,9 +1,11 @@
 import os
-import sys
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from .pool_metrics import PoolMetrics, timed_pool_class
 
 # ------------------------------------------------------------
 # 1️⃣  Force UTF-8 everywhere (safe for Japanese Windows)
@@ -13,12 +15,6 @@ os.environ["PGCLIENTENCODING"] = "UTF8"
 os.environ["LANG"] = "C.UTF-8"
 os.environ["LC_ALL"] = "C.UTF-8"
 
-# Fix stdout/stderr encoding only if needed (avoid double-wrapping)
-if sys.stdout.encoding.lower() != "utf-8":
-    sys.stdout.reconfigure(encoding="utf-8")
-if sys.stderr.encoding.lower() != "utf-8":
-    sys.stderr.reconfigure(encoding="utf-8")
-
 # ------------------------------------------------------------
 # 2️⃣  Load .env and get database URL
 # ------------------------------------------------------------
@@ -34,34 +30,78 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
 
-print("DATABASE_URL repr:", repr(DATABASE_URL))
+# ------------------------------------------------------------
+# 3️⃣  Pool and statement-cache settings (override via .env)
+# ------------------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a connection
+DB_ISOLATION_LEVEL = os.getenv("DB_ISOLATION_LEVEL", "AUTOCOMMIT")
+# SQLAlchemy's compiled-statement cache (per engine)
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "500"))
+# psycopg 3 server-side prepares a statement after this many executions;
+# "none" disables it (needed behind pgbouncer in transaction mode)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def _engine_options(url: str, pool_class, metrics: PoolMetrics) -> dict:
+    """Keyword arguments shared by the sync and async engines"""
+    options = {
+        "pool_pre_ping": True,
+        "echo": False,
+        "query_cache_size": DB_QUERY_CACHE_SIZE,
+    }
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        poolclass=timed_pool_class(pool_class, metrics),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    if url.startswith("postgresql"):
+        # client_encoding goes in the startup packet; no extra SET round-trip per connection
+        connect_args = {"options": "-c client_encoding=UTF8"}
+        if url.startswith("postgresql+psycopg"):
+            connect_args["prepare_threshold"] = (
+                None if DB_PREPARE_THRESHOLD.lower() == "none" else int(DB_PREPARE_THRESHOLD)
+            )
+        options["connect_args"] = connect_args
+    return options
+
 
 # ------------------------------------------------------------
-# 3️⃣  Create engine (psycopg3, fully UTF-8 safe)
+# 4️⃣  Create engines (psycopg3, fully UTF-8 safe)
 # ------------------------------------------------------------
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    echo=False,
-    isolation_level="AUTOCOMMIT",
-    connect_args={
-        "options": "-c client_encoding=UTF8",
-    },
+    isolation_level=DB_ISOLATION_LEVEL,
+    **_engine_options(DATABASE_URL, QueuePool, sync_pool_metrics),
 )
 
-# Force UTF-8 on every connection
-@event.listens_for(engine, "connect")
-def enforce_utf8(dbapi_conn, connection_record):
-    try:
-        with dbapi_conn.cursor() as cur:
-            cur.execute("SET client_encoding TO 'UTF8'")
-    except Exception:
-        pass
+# psycopg 3 speaks asyncio under the same "postgresql+psycopg://" dialect;
+# a plain SQLite URL (tests) maps to the aiosqlite driver
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if DATABASE_URL.startswith("sqlite://") else DATABASE_URL,
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics),
+)
 
 # ------------------------------------------------------------
-# 4️⃣  SQLAlchemy Session + Base
+# 5️⃣  SQLAlchemy Session + Base
 # ------------------------------------------------------------
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit; async sessions can't lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -72,3 +112,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency to get an async DB session"""
+    async with AsyncSessionLocal() as db:
+        yield db
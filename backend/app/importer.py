@@ -0,0 +1,420 @@
+"""
+Bulk import of ingredients and recipes from NDJSON or CSV
+Run: python -m app.importer recipes catalog.ndjson --email me@example.com
+     python -m app.importer ingredients pantry.csv --email me@example.com
+
+Records are validated in chunks against the API schemas and deduplicated
+in memory, then loaded in one transaction:
+
+- PostgreSQL (psycopg): each chunk is COPYed into a temporary staging table
+  and merged with a single INSERT ... SELECT (ON CONFLICT for ingredients,
+  NOT EXISTS for recipes, which also inserts their ingredients).
+- Anything else (SQLite in development): executemany through Core inserts.
+
+Ingredients are upserted by name like POST /ingredients/bulk: quantities
+are added in the unit already stored, and an expiry date is only replaced
+when given. Unlike the API, a null expiry date here (an empty CSV cell,
+say) counts as not given. Recipes whose name the
+owner already has are skipped. Running API processes
+notice new recipes on their next match or search and add them to their
+in-memory indexes (see app/recipe_index.py).
+"""
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, text
+
+from . import models, schemas, units
+from .database import engine
+from .models import parse_ingredient_entries, recipe_ingredient_row
+from .upsert import upsert_insert
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 20
+
+INGREDIENT_FIELDS = ["name", "category", "location", "quantity", "unit", "expiry_date"]
+RECIPE_FIELDS = ["name", "description", "instructions", "prep_time", "servings", "calories", "is_healthy"]
+RECIPE_INGREDIENT_FIELDS = ["position", "name", "display_name", "quantity", "unit"]
+
+
+@dataclass
+class ImportReport:
+    resource: str
+    read: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0  # recipes the owner already had
+    ingredient_rows: int = 0  # recipe_ingredients written with new recipes
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def error(self, line: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"record {line}: {message}")
+
+    def summary(self) -> str:
+        return (
+            f"{self.resource}: {self.read} read, {self.inserted} inserted, {self.updated} updated, "
+            f"{self.skipped} skipped, {self.duplicates} duplicates, {self.invalid} invalid "
+            f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} records/s)"
+        )
+
+
+# ------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------
+
+def read_records(stream: TextIO, format: str) -> Iterator[dict]:
+    """Yield raw dicts from an NDJSON or CSV text stream"""
+    if format == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    elif format == "csv":
+        for row in csv.DictReader(stream):
+            # Empty cells mean "not given"; nested lists arrive as JSON text
+            record = {key: value for key, value in row.items() if value not in ("", None)}
+            if isinstance(record.get("ingredient_items"), str):
+                record["ingredient_items"] = json.loads(record["ingredient_items"])
+            yield record
+    else:
+        raise ValueError(f"Unknown import format: {format}")
+
+
+def _chunks(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ------------------------------------------------------------
+# Validation
+# ------------------------------------------------------------
+
+def _validate_ingredient(record: dict) -> dict:
+    ingredient = schemas.IngredientCreate.model_validate(record)
+    return ingredient.model_dump()
+
+
+def _validate_recipe(record: dict) -> dict:
+    if isinstance(record.get("ingredients"), list):
+        record = {**record, "ingredients": json.dumps(record["ingredients"])}
+    recipe = schemas.RecipeCreate.model_validate(record)
+    if recipe.ingredient_items is not None:
+        entries = [item.model_dump() for item in recipe.ingredient_items]
+    else:
+        entries = parse_ingredient_entries(recipe.ingredients)
+    data = recipe.model_dump(include=set(RECIPE_FIELDS))
+    data["items"] = [recipe_ingredient_row(position, entry) for position, entry in enumerate(entries)]
+    return data
+
+
+def _validated(chunk: List[dict], first_line: int, validate, report: ImportReport) -> List[Tuple[int, dict]]:
+    """(record number, row) for every valid record"""
+    rows = []
+    for offset, record in enumerate(chunk):
+        try:
+            rows.append((first_line + offset, validate(record)))
+        except ValidationError as e:
+            report.error(first_line + offset, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            report.error(first_line + offset, str(e) or type(e).__name__)
+    return rows
+
+
+# ------------------------------------------------------------
+# Loading: PostgreSQL COPY + merge
+# ------------------------------------------------------------
+
+_STAGING_DDL = {
+    "ingredients": [
+        """CREATE TEMP TABLE import_ingredients (
+            name text, category text, location text, quantity double precision,
+            unit text, expiry_date date
+        ) ON COMMIT DROP""",
+    ],
+    "recipes": [
+        """CREATE TEMP TABLE import_recipes (
+            key integer, name text, description text, instructions text,
+            prep_time integer, servings integer, calories integer, is_healthy boolean
+        ) ON COMMIT DROP""",
+        """CREATE TEMP TABLE import_recipe_ingredients (
+            key integer, position integer, name text, display_name text, quantity double precision, unit text
+        ) ON COMMIT DROP""",
+    ],
+}
+
+_MERGE_INGREDIENTS = text("""
+    INSERT INTO ingredients (user_id, name, category, location, quantity, unit, expiry_date, created_at, updated_at, row_version)
+    SELECT :user_id, name, category, location, quantity, unit, expiry_date,
+           timezone('utc', now()), timezone('utc', clock_timestamp()), nextval('row_version_seq')
+    FROM import_ingredients
+    ON CONFLICT (user_id, name) DO UPDATE SET
+        category = coalesce(EXCLUDED.category, ingredients.category),
+        location = coalesce(EXCLUDED.location, ingredients.location),
+        quantity = ingredients.quantity + EXCLUDED.quantity,
+        expiry_date = coalesce(EXCLUDED.expiry_date, ingredients.expiry_date),
+        updated_at = EXCLUDED.updated_at,
+        row_version = nextval('row_version_seq')
+""")
+
+_MERGE_RECIPES = text("""
+    WITH inserted AS (
+        INSERT INTO recipes (
+            user_id, name, description, instructions, prep_time, servings, calories, is_healthy,
+            created_at, updated_at, row_version
+        )
+        SELECT :user_id, s.name, s.description, s.instructions, s.prep_time, s.servings, s.calories, s.is_healthy,
+               timezone('utc', now()), timezone('utc', clock_timestamp()), nextval('row_version_seq')
+        FROM import_recipes s
+        WHERE NOT EXISTS (SELECT 1 FROM recipes r WHERE r.user_id = :user_id AND r.name = s.name)
+        ORDER BY s.key
+        RETURNING id, name
+    ), items AS (
+        INSERT INTO recipe_ingredients (recipe_id, position, name, display_name, quantity, unit)
+        SELECT inserted.id, i.position, i.name, i.display_name, i.quantity, i.unit
+        FROM inserted
+        JOIN import_recipes s ON s.name = inserted.name
+        JOIN import_recipe_ingredients i ON i.key = s.key
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM items)
+""")
+
+
+def _copy(conn, table: str, columns: List[str], rows: Iterable[tuple]):
+    """COPY rows into a staging table through the raw psycopg connection"""
+    driver_connection = conn.connection.driver_connection
+    with driver_connection.cursor() as cursor:
+        with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def _load_postgres(conn, resource: str, rows: List[dict], user_id: int, report: ImportReport):
+    if resource == "ingredients":
+        conn.execute(text("TRUNCATE import_ingredients"))
+        _copy(conn, "import_ingredients", INGREDIENT_FIELDS,
+              ([row[name] for name in INGREDIENT_FIELDS] for row in rows))
+        conn.execute(_MERGE_INGREDIENTS, {"user_id": user_id})
+        return
+
+    conn.execute(text("TRUNCATE import_recipes, import_recipe_ingredients"))
+    _copy(conn, "import_recipes", ["key"] + RECIPE_FIELDS,
+          ([key] + [row[name] for name in RECIPE_FIELDS] for key, row in enumerate(rows)))
+    _copy(conn, "import_recipe_ingredients", ["key"] + RECIPE_INGREDIENT_FIELDS,
+          ([key] + [item[name] for name in RECIPE_INGREDIENT_FIELDS]
+           for key, row in enumerate(rows) for item in row["items"]))
+    inserted, items = conn.execute(_MERGE_RECIPES, {"user_id": user_id}).one()
+    report.inserted += inserted
+    report.skipped += len(rows) - inserted
+    report.ingredient_rows += items
+
+
+# ------------------------------------------------------------
+# Loading: executemany fallback
+# ------------------------------------------------------------
+
+def _load_executemany(conn, resource: str, rows: List[dict], user_id: int, report: ImportReport):
+    if resource == "ingredients":
+        table = models.Ingredient.__table__
+        statement = upsert_insert(conn.dialect.name, table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.name],
+            set_={
+                "quantity": table.c.quantity + statement.excluded.quantity,
+                **{
+                    name: func.coalesce(statement.excluded[name], table.c[name])
+                    for name in ("category", "location", "expiry_date")
+                },
+                "updated_at": statement.excluded.updated_at,
+                "row_version": models.next_row_version(),
+            },
+        )
+        conn.execute(statement, [{**row, "user_id": user_id} for row in rows])
+        return
+
+    existing = set(conn.scalars(
+        select(models.Recipe.name).where(
+            models.Recipe.user_id == user_id,
+            models.Recipe.name.in_([row["name"] for row in rows])
+        )
+    ))
+    new_rows = [row for row in rows if row["name"] not in existing]
+    report.skipped += len(rows) - len(new_rows)
+    if not new_rows:
+        return
+    recipes = models.Recipe.__table__
+    recipe_ids = conn.scalars(
+        insert(recipes).returning(recipes.c.id, sort_by_parameter_order=True),
+        [{**{name: row[name] for name in RECIPE_FIELDS}, "user_id": user_id} for row in new_rows]
+    ).all()
+    items = [
+        {**item, "recipe_id": recipe_id}
+        for recipe_id, row in zip(recipe_ids, new_rows)
+        for item in row["items"]
+    ]
+    if items:
+        conn.execute(insert(models.RecipeIngredient.__table__), items)
+    report.inserted += len(new_rows)
+    report.ingredient_rows += len(items)
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+
+def _merge_ingredients(conn, rows: List[Tuple[int, dict]], user_id: int, report: ImportReport) -> List[dict]:
+    """
+    One row per name, with quantities summed and converted to the unit
+    already stored for that ingredient (as POST /ingredients/bulk does).
+    Later records replace the other fields they give.
+    """
+    by_name: Dict[str, dict] = {}
+    merged = []
+    for line, row in rows:
+        current = by_name.get(row["name"])
+        if current is None:
+            by_name[row["name"]] = current = dict(row)
+            merged.append((line, current))
+            continue
+        try:
+            quantity = units.convert(row["quantity"], row["unit"], current["unit"])
+        except ValueError as e:
+            report.error(line, str(e))
+            continue
+        report.duplicates += 1
+        current["quantity"] += quantity
+        current.update({name: value for name, value in row.items()
+                        if name not in ("quantity", "unit") and value is not None})
+
+    stored_units = dict(conn.execute(
+        select(models.Ingredient.name, models.Ingredient.unit).where(
+            models.Ingredient.user_id == user_id,
+            models.Ingredient.name.in_(list(by_name))
+        )
+    ).all())
+    loaded = []
+    for line, row in merged:
+        stored_unit = stored_units.get(row["name"])
+        if stored_unit is not None:
+            try:
+                row["quantity"] = units.convert(row["quantity"], row["unit"], stored_unit)
+            except ValueError as e:
+                report.error(line, str(e))
+                continue
+            row["unit"] = stored_unit
+            report.updated += 1
+        else:
+            report.inserted += 1
+        loaded.append(row)
+    return loaded
+
+
+def import_records(
+    records: Iterable[dict],
+    resource: str,
+    user_id: int,
+    bind=engine,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Validate, dedupe and load ingredient or recipe records for one owner"""
+    if resource not in _STAGING_DDL:
+        raise ValueError(f"Unknown import resource: {resource}")
+    validate = _validate_ingredient if resource == "ingredients" else _validate_recipe
+    report = ImportReport(resource)
+    seen = set()
+    use_copy = bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg"
+    load = _load_postgres if use_copy else _load_executemany
+    start = time.perf_counter()
+
+    # The app engine runs in AUTOCOMMIT; import in one transaction
+    isolation_level = "SERIALIZABLE" if bind.dialect.name == "sqlite" else "READ COMMITTED"
+    with bind.execution_options(isolation_level=isolation_level).begin() as conn:
+        if use_copy:
+            for statement in _STAGING_DDL[resource]:
+                conn.execute(text(statement))
+        for chunk in _chunks(records, chunk_size):
+            first_line = report.read + 1
+            report.read += len(chunk)
+            rows = _validated(chunk, first_line, validate, report)
+
+            if resource == "ingredients":
+                rows = _merge_ingredients(conn, rows, user_id, report)
+            else:
+                # First record wins within the import
+                unique = []
+                for _, row in rows:
+                    if row["name"] in seen:
+                        report.duplicates += 1
+                    else:
+                        seen.add(row["name"])
+                        unique.append(row)
+                rows = unique
+
+            if rows:
+                load(conn, resource, rows, user_id, report)
+            report.seconds = time.perf_counter() - start
+            if progress:
+                progress(report)
+
+    report.seconds = time.perf_counter() - start
+    logger.info(f"✅ Imported {report.summary()}")
+    return report
+
+
+def _print_progress(report: ImportReport):
+    print(f"\r{report.read:>10,} records  {report.rows_per_second:>10,.0f}/s", end="", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Bulk import ingredients or recipes")
+    parser.add_argument("resource", choices=["ingredients", "recipes"])
+    parser.add_argument("path", help="NDJSON or CSV file, '-' for stdin")
+    parser.add_argument("--email", required=True, help="owner of the imported rows")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    with engine.connect() as conn:
+        user_id = conn.scalar(select(models.User.id).where(models.User.email == args.email))
+    if user_id is None:
+        sys.exit(f"No user with email {args.email}")
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    with stream:
+        report = import_records(
+            read_records(stream, format), args.resource, user_id,
+            chunk_size=args.chunk_size, progress=_print_progress,
+        )
+    print(file=sys.stderr)
+    print(report.summary())
+    for error in report.errors:
+        print(f"  {error}")
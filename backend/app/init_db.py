@@ -1,48 +1,32 @@
 """
-Database Initialization - Internal version for app package
-ASSUMES DATABASE ALREADY EXISTS - Only creates tables
+Database startup check - Internal version for app package
+ASSUMES SCHEMA ALREADY MIGRATED - run `python -m app.migrations` to create/upgrade it
 """
-import os
-
-# Force UTF-8 encoding FIRST, before any imports
-os.environ['PYTHONIOENCODING'] = 'utf-8'
-os.environ['PGCLIENTENCODING'] = 'UTF8'
-
-from sqlalchemy import text
-from .database import Base, engine, SessionLocal
-from .models import Ingredient, ShoppingList, ShoppingItem, Recipe
+from sqlalchemy import func, select
+from .database import async_engine
+from .migrations import SCHEMA_VERSION
+from .models import SchemaVersion
 import logging
 
 logger = logging.getLogger(__name__)
 
-def init_database_simple():
+async def verify_schema():
     """
-    Simple database initialization - creates tables only
-    Assumes database already exists (created via Docker)
+    Fast startup check: one query comparing the applied schema version
+    with the version this code expects. No DDL is run here.
     """
     try:
-        logger.info("Creating tables...")
-        
-        # Create all tables (this works even with encoding warnings)
-        Base.metadata.create_all(bind=engine)
-        
-        # Test connection - ignore encoding errors
-        try:
-            db = SessionLocal()
-            db.execute(text("SELECT 1"))
-            db.close()
-            logger.info("✅ Database tables created/verified")
-        except UnicodeDecodeError:
-            # Ignore encoding errors on test query
-            logger.info("✅ Database tables created (encoding warning ignored)")
-        
-        return True
-        
-    except UnicodeDecodeError as e:
-        # Even with encoding errors, tables might be created
-        logger.info("✅ Tables created despite encoding warning")
-        return True
-        
+        async with async_engine.connect() as conn:
+            version = await conn.scalar(select(func.max(SchemaVersion.version)))
     except Exception as e:
-        logger.error(f"❌ Database initialization error: {e}")
-        return False
\ No newline at end of file
+        logger.error(f"❌ Could not read schema version: {e}")
+        logger.error("Run `python -m app.migrations` to create the schema")
+        return False
+
+    if version != SCHEMA_VERSION:
+        logger.error(
+            f"❌ Database schema is at version {version}, expected {SCHEMA_VERSION}. "
+            "Run `python -m app.migrations`"
+        )
+        return False
+    return True
@@ -1,10 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import ingredients, shopping_lists, recipes
-from .init_db import init_database_simple
+from .routers import auth, ingredients, shopping_lists, recipes, metrics, export, imports, sync, profiles
+from .database import async_engine, engine
+from .init_db import verify_schema
+from .metrics import MetricsMiddleware, registry
+from .profiling import ProfilingMiddleware, profiler
+from .passwords import password_hasher
+from .pubsub import broker
 import logging
-import sys
-import os
 
 # Configure loggingg
 logging.basicConfig(level=logging.INFO)
@@ -23,45 +26,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id"],
 )
 
-# Initialize database on startup
+# Opt-in request profiles (X-Profile header or PROFILE_SAMPLE_RATE), viewed at /profiles
+app.add_middleware(ProfilingMiddleware)
+profiler.instrument_engine(engine)
+profiler.instrument_engine(async_engine.sync_engine)
+
+# Per-route latency, size and query counts, served at /metrics (outermost, so it times CORS too)
+app.add_middleware(MetricsMiddleware)
+registry.instrument_engine(engine)
+registry.instrument_engine(async_engine.sync_engine)
+
+# Verify database schema on startup
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on application startup"""
+    """Check the database schema version on application startup"""
     logger.info("Starting GroceryMate API...")
-    
-    try:
-        # Try simple initialization first
-        success = init_database_simple()
-        if success:
-            logger.info("✅ Database ready")
-        else:
-            # Fall back to trying the advanced init
-            logger.warning("Simple init failed, trying advanced init...")
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            if backend_dir not in sys.path:
-                sys.path.insert(0, backend_dir)
-            
-            try:
-                import simple_init_db
-                success = simple_init_db.init_database_simple()
-                if success:
-                    logger.info("✅ Database ready (via simple_init_db)")
-                else:
-                    logger.error("❌ Database initialization failed")
-            except Exception as e2:
-                logger.error(f"❌ All initialization methods failed: {e2}")
-    except Exception as e:
-        logger.error(f"❌ Error during database initialization: {e}")
-        logger.warning("⚠️  Continuing without database initialization")
-    
+
+    if await verify_schema():
+        logger.info("✅ Database ready")
+    else:
+        logger.warning("⚠️  Continuing with an unverified database schema")
+
     logger.info("GroceryMate API ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the password hashing workers and the pub/sub connection"""
+    password_hasher.shutdown()
+    await broker.close()
+
 # Include routers
+app.include_router(auth.router)
 app.include_router(ingredients.router)
 app.include_router(shopping_lists.router)
 app.include_router(recipes.router)
+app.include_router(metrics.router)
+app.include_router(export.router)
+app.include_router(imports.router)
+app.include_router(sync.router)
+app.include_router(profiles.router)
 
 @app.get("/")
 def read_root():
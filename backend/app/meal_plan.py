@@ -0,0 +1,103 @@
+"""
+Shopping list generation for a set of recipes.
+
+Works on plain rows so the router can fetch everything it needs in two
+queries (recipe ingredients, then pantry stock) and insert the result in
+one batch. Quantities are converted column-wise to base units (see
+app/units.py), summed per (name, dimension), and pantry stock is
+subtracted; whatever is still missing becomes a shopping item.
+Ingredients a recipe lists without a quantity ("salt") are covered by any
+stock of that name, whatever its unit.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .models import normalize_ingredient_name
+from . import units
+
+
+class Deficit(NamedTuple):
+    name: str
+    quantity: float
+    unit: str
+
+
+class Requirements(NamedTuple):
+    quantities: Dict[Tuple[str, str], float]  # (name, dimension) -> base quantity
+    units: Dict[Tuple[str, str], str]  # (name, dimension) -> unit to display
+    unquantified: Dict[str, Tuple[float, str]]  # name -> (units to buy if out of stock, unit)
+
+    def names(self) -> set:
+        return {name for name, _ in self.quantities} | set(self.unquantified)
+
+
+def aggregate_requirements(
+    rows: Iterable[Tuple[int, str, Optional[float], Optional[str]]],
+    multipliers: Dict[int, float],
+) -> Requirements:
+    """
+    Sum (recipe_id, name, quantity, unit) rows per ingredient and dimension,
+    scaled by each recipe's servings multiplier. Ingredients listed without
+    a quantity are kept apart; if they have to be bought, it's one unit per
+    recipe.
+    """
+    rows = [row for row in rows if row[1] is not None]
+    unquantified = {}
+    for recipe_id, name, quantity, unit in rows:
+        if quantity is None:
+            count, shown = unquantified.get(name, (0.0, units.normalize_unit(unit)))
+            unquantified[name] = (count + multipliers[recipe_id], shown)
+    rows = [row for row in rows if row[2] is not None]
+    base, dimensions = units.to_base([row[2] for row in rows], [row[3] for row in rows])
+    quantities = defaultdict(float)
+    display = {}
+    for (recipe_id, name, _, unit), amount, dimension in zip(rows, base, dimensions):
+        key = (name, dimension)
+        quantities[key] += amount * multipliers[recipe_id]
+        display.setdefault(key, units.normalize_unit(unit))
+    return Requirements(quantities, display, unquantified)
+
+
+def subtract_pantry(
+    required: Requirements,
+    pantry: Iterable[Tuple[str, Optional[float], Optional[str]]],
+) -> List[Deficit]:
+    """
+    Subtract (name, quantity, unit) pantry rows from the requirements and
+    return what is left to buy, sorted by name. Stock counts against any
+    requirement of the same dimension; deficits are expressed in the
+    pantry's unit when there is one, otherwise in the recipe's. Unquantified
+    requirements are met by any positive stock of the name, and otherwise
+    only bought when no quantified requirement already buys that name.
+    """
+    pantry = list(pantry)
+    base, dimensions = units.to_base([row[1] for row in pantry], [row[2] for row in pantry])
+    stock = defaultdict(float)
+    in_stock = set()
+    display = dict(required.units)
+    for (name, _, unit), amount, dimension in zip(pantry, base, dimensions):
+        name = normalize_ingredient_name(name)
+        key = (name, dimension)
+        stock[key] += amount
+        if amount > 0:
+            in_stock.add(name)
+        if key in display:
+            display[key] = units.normalize_unit(unit)
+
+    missing = [
+        (key, quantity - stock.get(key, 0.0))
+        for key, quantity in required.quantities.items()
+    ]
+    missing = [(key, quantity) for key, quantity in missing if quantity > 1e-9]
+    shown = units.from_base([quantity for _, quantity in missing], [display[key] for key, _ in missing])
+    deficits = [
+        Deficit(name, round(quantity, 3), display[(name, dimension)])
+        for ((name, dimension), _), quantity in zip(missing, shown)
+    ]
+    bought = {deficit.name for deficit in deficits}
+    deficits += [
+        Deficit(name, round(count, 3), unit)
+        for name, (count, unit) in required.unquantified.items()
+        if name not in in_stock and name not in bought
+    ]
+    return sorted(deficits)
@@ -0,0 +1,189 @@
+"""
+Schema versioning and migrations
+Run: python -m app.migrations          (upgrade to the latest version)
+     python -m app.migrations --check  (exit 1 if an upgrade is needed)
+
+Full DDL only happens here. The API just compares the newest applied
+version with SCHEMA_VERSION on startup, which is a single query.
+
+An upgrade first creates any missing tables from the models, then runs
+each migration newer than the database's version in order. Migrations must
+be idempotent, because a fresh database already has the latest tables
+when they run.
+"""
+import argparse
+import logging
+import sys
+from sqlalchemy import func, inspect, select, text
+from .database import engine
+from .models import (
+    Base, Ingredient, Recipe, RecipeIngredient, SchemaVersion, ShoppingItem, Tombstone, parse_ingredient_entries,
+    recipe_ingredient_row
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+def migration(version: int, description: str):
+    """Register an upgrade step; versions must be unique and increasing"""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+def current_version(conn):
+    """Newest applied version, or None if the database isn't versioned yet"""
+    if not inspect(conn).has_table(SchemaVersion.__tablename__):
+        return None
+    return conn.scalar(select(func.max(SchemaVersion.version)))
+
+def upgrade(bind=engine) -> int:
+    """Bring the database up to SCHEMA_VERSION; returns the version reached"""
+    # The app engine runs in AUTOCOMMIT; upgrade in one transaction
+    isolation_level = "SERIALIZABLE" if bind.dialect.name == "sqlite" else "READ COMMITTED"
+    with bind.execution_options(isolation_level=isolation_level).begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Serialize concurrent upgrades (e.g. several deploys at once)
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('grocerymate_schema'))"))
+        Base.metadata.create_all(bind=conn)
+        version = current_version(conn) or 0
+        for step_version, description, fn in sorted(MIGRATIONS):
+            if step_version <= version:
+                continue
+            logger.info(f"Applying migration {step_version}: {description}")
+            fn(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(version=step_version, description=description))
+            version = step_version
+    logger.info(f"✅ Database schema at version {version}")
+    return version
+
+# ------------------------------------------------------------
+# Migrations
+# ------------------------------------------------------------
+
+@migration(1, "Move recipes.ingredients JSON into recipe_ingredients")
+def _recipe_ingredients(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("recipes")}
+    if "ingredients" not in columns:
+        return
+
+    already_migrated = {
+        recipe_id for (recipe_id,) in conn.execute(text("SELECT DISTINCT recipe_id FROM recipe_ingredients"))
+    }
+    rows = []
+    for recipe_id, ingredients_json in conn.execute(text("SELECT id, ingredients FROM recipes")):
+        if recipe_id in already_migrated:
+            continue
+        try:
+            entries = parse_ingredient_entries(ingredients_json)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # The column is dropped below; keep the raw text as one ingredient rather than lose it
+            logger.warning(f"⚠️  Recipe {recipe_id}: unparseable ingredients, kept as a single entry")
+            raw = (ingredients_json or "").strip()
+            entries = [{"name": raw, "quantity": None, "unit": None}] if raw else []
+        for position, entry in enumerate(entries):
+            rows.append({"recipe_id": recipe_id, **recipe_ingredient_row(position, entry)})
+
+    if rows:
+        conn.execute(RecipeIngredient.__table__.insert(), rows)
+    conn.execute(text("ALTER TABLE recipes DROP COLUMN ingredients"))
+
+@migration(2, "Add per-owner expiry and location indexes on ingredients")
+def _ingredient_owner_indexes(conn):
+    for index in Ingredient.__table__.indexes:
+        if index.name in ("ix_ingredients_user_expiry", "ix_ingredients_user_location"):
+            index.create(bind=conn, checkfirst=True)
+
+@migration(3, "Make ingredient names unique per owner instead of globally")
+def _ingredient_name_per_owner(conn):
+    conn.execute(text("DROP INDEX IF EXISTS ix_ingredients_name"))
+    for index in Ingredient.__table__.indexes:
+        if index.name == "uq_ingredients_user_name":
+            index.create(bind=conn, checkfirst=True)
+
+@migration(4, "Add full-text and trigram search indexes on recipes")
+def _recipe_search(conn):
+    # PostgreSQL only; other backends search with the in-memory index (app/recipe_search.py)
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text("""
+        ALTER TABLE recipes ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_recipes_search_vector ON recipes USING gin (search_vector)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_recipes_name_trgm ON recipes USING gin (name gin_trgm_ops)"))
+
+@migration(5, "Add row versions and updated_at for incremental sync")
+def _row_versions(conn):
+    postgres = conn.dialect.name == "postgresql"
+    if postgres:
+        conn.execute(text("CREATE SEQUENCE IF NOT EXISTS row_version_seq"))
+    for model in (Ingredient, Recipe, ShoppingItem):
+        table = model.__tablename__
+        columns = {column["name"] for column in inspect(conn).get_columns(table)}
+        if "updated_at" not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP"))
+            backfill = "created_at" if "created_at" in columns else "CURRENT_TIMESTAMP"
+            conn.execute(text(f"UPDATE {table} SET updated_at = {backfill}"))
+        if "row_version" not in columns:
+            if postgres:
+                # The default numbers existing rows; new ones get theirs from the model
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN row_version bigint NOT NULL DEFAULT nextval('row_version_seq')"
+                ))
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN row_version DROP DEFAULT"))
+            else:
+                # SQLite can't add a NOT NULL column without a constant default
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1"))
+        for index in model.__table__.indexes:
+            if "row_version" in index.columns:
+                index.create(bind=conn, checkfirst=True)
+
+@migration(6, "Index row versions for the SQLite version counter and recipe tombstones")
+def _row_version_indexes(conn):
+    # ix_ingredients_row_version is SQLite-only (ddl_if), so create() skips it on PostgreSQL
+    for model in (Ingredient, Tombstone):
+        for index in model.__table__.indexes:
+            if index.name in ("ix_ingredients_row_version", "ix_tombstones_table_row_version"):
+                index.create(bind=conn, checkfirst=True)
+
+@migration(7, "Index shopping items by list")
+def _shopping_item_list_index(conn):
+    for index in ShoppingItem.__table__.indexes:
+        if index.name == "ix_shopping_items_list_row_version":
+            index.create(bind=conn, checkfirst=True)
+
+@migration(8, "Keep recipe ingredient names as written next to the normalized key")
+def _recipe_ingredient_display_names(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("recipe_ingredients")}
+    if "display_name" in columns:
+        return
+    # The original spelling is gone; the normalized name is the best display left
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE recipe_ingredients ADD COLUMN display_name VARCHAR"))
+        conn.execute(text("UPDATE recipe_ingredients SET display_name = name"))
+        conn.execute(text("ALTER TABLE recipe_ingredients ALTER COLUMN display_name SET NOT NULL"))
+    else:
+        # SQLite can't add a NOT NULL column without a constant default
+        conn.execute(text("ALTER TABLE recipe_ingredients ADD COLUMN display_name VARCHAR NOT NULL DEFAULT ''"))
+        conn.execute(text("UPDATE recipe_ingredients SET display_name = name"))
+
+SCHEMA_VERSION = max(version for version, _, _ in MIGRATIONS)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Upgrade the GroceryMate database schema")
+    parser.add_argument("--check", action="store_true", help="only report whether an upgrade is needed")
+    args = parser.parse_args()
+
+    if args.check:
+        with engine.connect() as conn:
+            version = current_version(conn)
+        print(f"Database version: {version}, expected: {SCHEMA_VERSION}")
+        sys.exit(0 if version == SCHEMA_VERSION else 1)
+    upgrade()
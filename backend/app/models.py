@@ -1,8 +1,93 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, Text, DateTime
+from sqlalchemy import BigInteger, Column, Integer, String, Float, Date, Boolean, ForeignKey, Text, DateTime, Index, Sequence, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.functions import FunctionElement
 from datetime import datetime
+import json
 from .database import Base
 
+
+def normalize_ingredient_name(name: str) -> str:
+    """Normalize an ingredient name for matching"""
+    return " ".join(name.split()).lower()
+
+
+def parse_ingredient_entries(ingredients_json: str) -> list:
+    """
+    Parse the legacy JSON ingredients form into name/quantity/unit dicts.
+    Accepts a list of names or of {"name", "quantity", "unit"} objects.
+    """
+    entries = []
+    for entry in json.loads(ingredients_json):
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        entries.append({"name": entry["name"], "quantity": entry.get("quantity"), "unit": entry.get("unit")})
+    return entries
+
+
+def recipe_ingredient_row(position: int, entry: dict) -> dict:
+    """recipe_ingredients values for a name/quantity/unit dict, keeping the name as written for display"""
+    return {
+        "position": position,
+        "name": normalize_ingredient_name(entry["name"]),
+        "display_name": " ".join(entry["name"].split()),
+        "quantity": entry.get("quantity"),
+        "unit": entry.get("unit"),
+    }
+
+# ROW VERSIONS (see app/sync.py)
+
+# One counter shared by every synced table, so a single number marks a client's sync position
+row_version_seq = Sequence("row_version_seq", metadata=Base.metadata)
+
+# Tables stamped with next_row_version(); the SQLite fallback scans their maxima
+VERSIONED_TABLES = ("ingredients", "recipes", "shopping_items", "tombstones")
+
+class next_row_version(FunctionElement):
+    """Next row version: the sequence on PostgreSQL, one past the current maximum elsewhere"""
+    type = BigInteger()
+    inherit_cache = True
+
+@compiles(next_row_version, "postgresql")
+def _next_row_version_postgresql(element, compiler, **kw):
+    return "nextval('row_version_seq')"
+
+@compiles(next_row_version)
+def _next_row_version_default(element, compiler, **kw):
+    # No sequences here (SQLite); writers are serialized, so max + 1 only ever grows.
+    # Every table has a row_version index, so each max() is a single index seek
+    maxima = " UNION ALL ".join(f"SELECT max(row_version) AS v FROM {table}" for table in VERSIONED_TABLES)
+    return f"(SELECT coalesce(max(v), 0) + 1 FROM ({maxima}))"
+
+class utc_now(FunctionElement):
+    """
+    The database's current UTC time, read when the statement runs. Change
+    stamps use it so they share one clock with sync.settled_before()
+    """
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utc_now, "postgresql")
+def _utc_now_postgresql(element, compiler, **kw):
+    # clock_timestamp(), not now(): a long transaction's later writes mustn't look older than they are
+    return "timezone('utc', clock_timestamp())"
+
+@compiles(utc_now)
+def _utc_now_default(element, compiler, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+def row_version_column(**kwargs) -> Column:
+    """Bumped on every INSERT and UPDATE (ON CONFLICT DO UPDATE must set it explicitly)"""
+    return Column(BigInteger, nullable=False, default=next_row_version(), onupdate=next_row_version(), **kwargs)
+
+# SCHEMA VERSION (see app/migrations.py)
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
 # USER 
 
 class User(Base):
@@ -22,16 +107,35 @@ class User(Base):
 
 class Ingredient(Base):
     __tablename__ = "ingredients"
-    
+    __table_args__ = (
+        # Expiring-soon lookups: per owner, in expiry order, never-expiring rows left out
+        Index(
+            "ix_ingredients_user_expiry",
+            "user_id",
+            "expiry_date",
+            postgresql_where=text("expiry_date IS NOT NULL"),
+            sqlite_where=text("expiry_date IS NOT NULL"),
+        ),
+        # Per-owner listing by location, paged by id
+        Index("ix_ingredients_user_location", "user_id", "location", "id"),
+        # Names are unique per owner; also the ON CONFLICT target for bulk upserts
+        Index("uq_ingredients_user_name", "user_id", "name", unique=True),
+        # Per-owner "changed since" scans for /sync
+        Index("ix_ingredients_user_row_version", "user_id", "row_version"),
+        # max(row_version) for next_row_version() on SQLite; PostgreSQL uses the sequence
+        Index("ix_ingredients_row_version", "row_version").ddl_if(dialect="sqlite"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
     category = Column(String, nullable=False)  # Dairy, Vegetables, Fruits, Meat, etc.
     location = Column(String, nullable=False)  # Fridge or Pantry
     quantity = Column(Float, default=0)
     unit = Column(String, nullable=False)  # kg, liters, pieces, etc.
     expiry_date = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
+    row_version = row_version_column()
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="ingredients")
 
@@ -47,13 +151,19 @@ class ShoppingList(Base):
 
 class ShoppingItem(Base):
     __tablename__ = "shopping_items"
-    
+    __table_args__ = (
+        # Items of a list, and the list's cache version (app/cache.py)
+        Index("ix_shopping_items_list_row_version", "shopping_list_id", "row_version"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     shopping_list_id = Column(Integer, ForeignKey("shopping_lists.id"))
     item_name = Column(String, nullable=False)
     quantity = Column(Float, default=1)
     unit = Column(String, nullable=False)
     is_purchased = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
+    row_version = row_version_column(index=True)
     shopping_list = relationship("ShoppingList", back_populates="items")
 
 class Recipe(Base):
@@ -62,12 +172,66 @@ class Recipe(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     description = Column(Text)
-    ingredients = Column(Text, nullable=False)  # JSON string of ingredients
     instructions = Column(Text, nullable=False)
     prep_time = Column(Integer)  # in minutes
     servings = Column(Integer, default=2)
     calories = Column(Integer, nullable=True)
     is_healthy = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=utc_now(), onupdate=utc_now())
+    row_version = row_version_column(index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="recipes")
+    ingredient_items = relationship(
+        "RecipeIngredient",
+        back_populates="recipe",
+        cascade="all, delete-orphan",
+        order_by="RecipeIngredient.position",
+    )
+
+    @property
+    def ingredients(self) -> str:
+        """Legacy JSON string of ingredient names"""
+        return json.dumps([item.display_name for item in self.ingredient_items])
+
+    @ingredients.setter
+    def ingredients(self, ingredients_json: str):
+        self.set_ingredients(parse_ingredient_entries(ingredients_json))
+
+    def set_ingredients(self, entries):
+        """Replace ingredients from name/quantity/unit dicts"""
+        self.ingredient_items = [
+            RecipeIngredient(**recipe_ingredient_row(position, entry))
+            for position, entry in enumerate(entries)
+        ]
+
+class RecipeIngredient(Base):
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        # Covers "which recipes use these ingredients" lookups
+        Index("ix_recipe_ingredients_name_recipe_id", "name", "recipe_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
+    name = Column(String, nullable=False)  # normalized, see normalize_ingredient_name
+    display_name = Column(String, nullable=False)  # as the recipe spells it
+    quantity = Column(Float, nullable=True)
+    unit = Column(String, nullable=True)
+    recipe = relationship("Recipe", back_populates="ingredient_items")
+
+class Tombstone(Base):
+    """A deleted synced row, kept so /sync can tell clients to drop it"""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        # Newest deletion per table, e.g. recipe_index.recipes_version()
+        Index("ix_tombstones_table_row_version", "table_name", "row_version"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)  # owner at deletion time; the user may be gone since
+    deleted_at = Column(DateTime, default=utc_now())
+    row_version = row_version_column(index=True)
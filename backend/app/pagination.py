@@ -0,0 +1,80 @@
+"""
+Keyset pagination and column projection helpers for list endpoints.
+
+Pages are ordered by primary key and continue from `cursor` (the last id of
+the previous page); the next cursor is returned in the X-Next-Cursor header
+so the response body keeps its plain list shape. Results are only paged
+when the caller passes `limit` or `cursor` (clients that don't follow the
+header get everything); a cursor without a limit uses DEFAULT_PAGE_SIZE.
+"""
+from typing import List, Optional
+from fastapi import HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from .serialization import dumps
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def projection_columns(model, schema, fields: Optional[str]) -> Optional[List]:
+    """
+    Resolve a comma-separated fields= value to model columns.
+    Only plain columns exposed by the response schema can be selected;
+    `id` is always included because it drives the cursor.
+    """
+    if not fields:
+        return None
+    table_columns = model.__table__.columns
+    allowed = [name for name in schema.model_fields if name in table_columns]
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return [getattr(model, name) for name in dict.fromkeys(requested)]
+
+
+async def paginate(
+    db: AsyncSession, statement, id_column, cursor: Optional[int], limit: Optional[int], projected: bool = False
+):
+    """
+    Return (rows, next_cursor) for one keyset page of a select() statement,
+    or every row when neither cursor nor limit is given.
+    Projected statements yield Row tuples, otherwise ORM entities.
+    """
+    statement = statement.order_by(id_column)
+    if cursor is not None:
+        statement = statement.where(id_column > cursor)
+        limit = limit or DEFAULT_PAGE_SIZE
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    result = await db.execute(statement)
+    rows = result.all() if projected else result.scalars().all()
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[int]):
+    """Advertise the next page, if any"""
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+
+
+def page_response(data: list, next_cursor: Optional[int]) -> Response:
+    """Encode an already-shaped page (see app/serialization.py), bypassing response_model"""
+    response = Response(content=dumps(data), media_type="application/json")
+    set_next_cursor(response, next_cursor)
+    return response
+
+
+def projection_response(rows, next_cursor: Optional[int]) -> Response:
+    """Serialize projected rows directly, skipping ORM hydration and response_model"""
+    return page_response([row._asdict() for row in rows], next_cursor)
+
@@ -0,0 +1,73 @@
+"""
+Connection pool instrumentation.
+
+The engines in app.database use pool classes built by `timed_pool_class`,
+which time every checkout (including the wait for a free connection) and
+count timeouts. Snapshots are served at /metrics/db-pool.
+"""
+import threading
+import time
+from sqlalchemy import exc
+
+
+class PoolMetrics:
+    """Counters for one engine's connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            if wait_seconds > self.wait_seconds_max:
+                self.wait_seconds_max = wait_seconds
+
+    def snapshot(self) -> dict:
+        """Current gauges and cumulative counters"""
+        pool = self.pool
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+        # size()/checkedout()/overflow() only exist on queue-based pools
+        for gauge in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, gauge, None)
+            stats[gauge] = method() if callable(method) else None
+        return stats
+
+
+def timed_pool_class(base, metrics: PoolMetrics):
+    """Subclass a SQLAlchemy pool class so checkouts report into `metrics`"""
+
+    class TimedPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # Pools are re-created on dispose(); always report the live one
+            metrics.pool = self
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record_checkout(time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
@@ -0,0 +1,230 @@
+"""
+Opt-in request profiling with slow-query and N+1 detection.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>`, or at
+random with probability PROFILE_SAMPLE_RATE. A profiled request records
+every SQL statement it runs (text and duration, never parameters) and, if
+no other profile is running, a cProfile of the event loop thread. Note
+that the cProfile also covers anything else the loop runs meanwhile, and
+not work done in the threadpool.
+
+Statements repeated PROFILE_REPEAT_THRESHOLD times or more are flagged as
+likely N+1 patterns. Explicitly requested profiles, and sampled ones
+slower than PROFILE_SLOW_SECONDS, go into a ring buffer of the last
+PROFILE_BUFFER_SIZE, viewable at /profiles (admins only). Responses carry
+the profile id in X-Profile-Id.
+
+With neither a token nor a sample rate set, the middleware only checks a
+header and passes the request through.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", "0.5"))
+PROFILE_SLOW_QUERY_SECONDS = float(os.getenv("PROFILE_SLOW_QUERY_SECONDS", "0.1"))
+PROFILE_REPEAT_THRESHOLD = int(os.getenv("PROFILE_REPEAT_THRESHOLD", "5"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Statements kept per profile; counts and N+1 detection still see all of them
+MAX_RECORDED_STATEMENTS = 500
+# Functions listed in the cProfile summary
+PROFILE_TOP_FUNCTIONS = 40
+
+
+class Capture:
+    """SQL run by one profiled request"""
+    __slots__ = ("statements", "query_count", "query_seconds", "repeats")
+
+    def __init__(self):
+        self.statements: List[dict] = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.repeats: Dict[str, List[float]] = {}  # statement -> [count, seconds]
+
+    def record(self, statement: str, seconds: float, executemany: bool):
+        self.query_count += 1
+        self.query_seconds += seconds
+        repeat = self.repeats.setdefault(statement, [0, 0.0])
+        repeat[0] += 1
+        repeat[1] += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append({
+                "statement": statement,
+                "seconds": round(seconds, 6),
+                "executemany": executemany,
+            })
+
+
+_current_capture: ContextVar[Optional[Capture]] = ContextVar("profile_capture", default=None)
+
+
+class Profiler:
+    """Decides which requests to profile and keeps the recent profiles"""
+
+    def __init__(
+        self,
+        token: str = PROFILE_TOKEN,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        buffer_size: int = PROFILE_BUFFER_SIZE,
+    ):
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.profiles: deque = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+        # Only one cProfile can be active per process
+        self._cprofile_lock = threading.Lock()
+
+    def requested(self, scope) -> bool:
+        if not self.token:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    def instrument_engine(self, engine):
+        """Capture statements for profiled requests; pass async_engine.sync_engine for async ones"""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if _current_capture.get() is not None:
+                conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            capture = _current_capture.get()
+            if capture is not None:
+                capture.record(statement, time.perf_counter() - conn.info["profile_query_start"].pop(), executemany)
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("profile_query_start"):
+                connection.info["profile_query_start"].pop()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def start_cprofile(self) -> Optional[cProfile.Profile]:
+        """A running cProfile, or None while another request holds it"""
+        if not self._cprofile_lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop_cprofile(self, profile: cProfile.Profile) -> str:
+        """Stop a profile from start_cprofile() and summarize it"""
+        profile.disable()
+        self._cprofile_lock.release()
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return output.getvalue()
+
+    def store(self, record: dict):
+        self.profiles.append(record)
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        for record in self.profiles:
+            if record["id"] == profile_id:
+                return record
+        return None
+
+    def summaries(self) -> List[dict]:
+        """Newest first, without statements and profile text"""
+        return [
+            {key: value for key, value in record.items() if key not in ("statements", "profile")}
+            for record in reversed(self.profiles)
+        ]
+
+
+profiler = Profiler()
+
+
+def _likely_n_plus_one(capture: Capture) -> List[dict]:
+    return sorted(
+        (
+            {"statement": statement, "count": count, "seconds": round(seconds, 6)}
+            for statement, (count, seconds) in capture.repeats.items()
+            if count >= PROFILE_REPEAT_THRESHOLD
+        ),
+        key=lambda repeat: repeat["count"],
+        reverse=True,
+    )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it, or a random sample"""
+
+    def __init__(self, app, registry: Profiler = profiler):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        requested = self.registry.requested(scope)
+        if not requested and not (self.registry.sample_rate and random.random() < self.registry.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.registry.next_id()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, str(profile_id).encode())]
+            await send(message)
+
+        capture = Capture()
+        token = _current_capture.set(capture)
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        profile = self.registry.start_cprofile()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile_text = self.registry.stop_cprofile(profile) if profile is not None else None
+            elapsed = time.perf_counter() - start
+            _current_capture.reset(token)
+            if requested or elapsed >= PROFILE_SLOW_SECONDS:
+                self.registry.store({
+                    "id": profile_id,
+                    "at": started_at.isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status,
+                    "trigger": "header" if requested else "sample",
+                    "seconds": round(elapsed, 6),
+                    "query_count": capture.query_count,
+                    "query_seconds": round(capture.query_seconds, 6),
+                    "n_plus_one": _likely_n_plus_one(capture),
+                    "slow_queries": [
+                        statement for statement in capture.statements
+                        if statement["seconds"] >= PROFILE_SLOW_QUERY_SECONDS
+                    ],
+                    "statements": capture.statements,
+                    "profile": profile_text,
+                })
@@ -0,0 +1,145 @@
+"""
+Publish/subscribe for pushing shopping list changes to connected clients.
+
+The default InMemoryBroker fans messages out to subscribers in this
+process. With several workers, set PUBSUB_URL=redis://host:6379/0: the
+RedisBroker publishes through Redis and one listener per process relays
+everything back to its local subscribers (needs the `redis` package).
+
+Each subscriber has a bounded queue. A subscriber that falls behind has
+its backlog replaced by a single {"type": "resync"} message, telling the
+client to reload instead of letting the queue grow.
+"""
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+PUBSUB_URL = os.getenv("PUBSUB_URL", "")
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "256"))
+
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Messages for one subscriber; iterate with `async for`"""
+
+    def __init__(self, channel: str, max_size: int):
+        self.channel = channel
+        self._queue: asyncio.Queue = asyncio.Queue(max_size)
+
+    def deliver(self, message: dict):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop the backlog, ask the client to reload
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.get()
+
+
+class InMemoryBroker:
+    """Fan-out to subscribers within this process"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def dispatch(self, channel: str, message: dict):
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(message)
+
+    async def publish(self, channel: str, message: dict):
+        self.dispatch(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription(channel, self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    async def close(self):
+        pass
+
+
+class RedisBroker(InMemoryBroker):
+    """Publishes through Redis; one pattern listener per process feeds local subscribers"""
+
+    def __init__(self, url: str, pattern: str = "*", queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        super().__init__(queue_size)
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("PUBSUB_URL points at Redis but the `redis` package is not installed")
+        self._redis = redis.from_url(url)
+        self._pattern = pattern
+        self._listener: Optional[asyncio.Task] = None
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        pubsub = self._redis.pubsub()
+        await pubsub.psubscribe(self._pattern)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                channel = message["channel"]
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                try:
+                    self.dispatch(channel, json.loads(message["data"]))
+                except ValueError:
+                    logger.warning(f"⚠️  Ignoring malformed pub/sub message on {channel}")
+        finally:
+            await pubsub.aclose()
+
+    async def publish(self, channel: str, message: dict):
+        # Delivered locally when it comes back through the listener
+        self._ensure_listener()
+        await self._redis.publish(channel, json.dumps(message, default=str))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        self._ensure_listener()
+        async with super().subscribe(channel) as subscription:
+            yield subscription
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        await self._redis.aclose()
+
+
+def create_broker(url: str = PUBSUB_URL) -> InMemoryBroker:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    return InMemoryBroker()
+
+
+broker = create_broker()
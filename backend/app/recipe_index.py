@@ -0,0 +1,245 @@
+"""
+In-process inverted index used for pantry -> recipe matching.
+
+Each normalized ingredient name maps to the set of recipe ids that use it,
+and each recipe keeps its own set of names. A query walks only the
+postings of the pantry's names, counting per recipe how many of its
+ingredients are available; a recipe can be cooked once that count reaches
+its number of ingredients. Recipes without ingredients are kept apart and
+always match.
+
+Recipes can be written by other workers, the importer or seed_data, so
+every query first compares `recipes_version()` (newest recipe row version
+and newest recipe tombstone, two index lookups) with the version the index
+has caught up to, then applies only the recipes written or deleted since.
+On PostgreSQL a transaction can commit a version below one already applied
+(see app/sync.py), so there the index is also rebuilt from scratch once it
+is RECIPE_INDEX_REBUILD_SECONDS old.
+"""
+import asyncio
+import heapq
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+RECIPE_INDEX_REBUILD_SECONDS = float(os.getenv("RECIPE_INDEX_REBUILD_SECONDS", "300"))
+
+
+def recipes_version_query():
+    """
+    (newest recipe row version, newest recipe tombstone) as a select(): two
+    index seeks, whatever the number of recipes
+    """
+    return select(
+        select(func.max(models.Recipe.row_version)).scalar_subquery(),
+        select(func.max(models.Tombstone.row_version))
+        .where(models.Tombstone.table_name == models.Recipe.__tablename__).scalar_subquery(),
+    )
+
+
+async def recipes_version(db: AsyncSession) -> Tuple[Optional[int], Optional[int]]:
+    """Changes whenever a recipe is added, updated or deleted, by any process"""
+    return tuple((await db.execute(recipes_version_query())).one())
+
+
+class VersionedRecipeIndex:
+    """
+    An in-memory recipe index kept in step with the database. Subclasses
+    implement _fetch(), _add(), _remove() and _clear().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = asyncio.Lock()
+        self._version = None  # recipes_version() the index has caught up to
+        self._built_at = 0.0
+
+    async def _fetch(self, db: AsyncSession, conditions) -> List[tuple]:
+        """_add() arguments for every recipe matching conditions"""
+        raise NotImplementedError
+
+    def _add(self, recipe_id: int, *args):
+        raise NotImplementedError
+
+    def _remove(self, recipe_id: int):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _needs_rebuild(self, db: AsyncSession) -> bool:
+        if self._version is None:
+            return True
+        return (
+            db.bind.dialect.name == "postgresql"
+            and time.monotonic() - self._built_at > RECIPE_INDEX_REBUILD_SECONDS
+        )
+
+    async def ensure_loaded(self, db: AsyncSession):
+        """Catch up with recipes written or deleted since the last call, by any process"""
+        version = await recipes_version(db)
+        if self._version == version and not self._needs_rebuild(db):
+            return
+        async with self._load_lock:
+            rebuild = self._needs_rebuild(db)
+            if self._version == version and not rebuild:
+                return
+            if rebuild:
+                recipes = await self._fetch(db, ())
+                deleted = []
+            else:
+                recipe_version, tombstone_version = self._version
+                recipes = await self._fetch(db, (models.Recipe.row_version > (recipe_version or 0),))
+                deleted = (await db.scalars(
+                    select(models.Tombstone.row_id).where(
+                        models.Tombstone.table_name == models.Recipe.__tablename__,
+                        models.Tombstone.row_version > (tombstone_version or 0),
+                    )
+                )).all()
+            with self._lock:
+                if rebuild:
+                    self._clear()
+                    self._built_at = time.monotonic()
+                # Deletions first: SQLite may hand a deleted recipe's id to a new one
+                for recipe_id in deleted:
+                    self._remove(recipe_id)
+                for recipe in recipes:
+                    self._add(*recipe)
+                self._version = version
+
+    def invalidate(self):
+        """Forget everything; the next query rebuilds from the database"""
+        with self._lock:
+            self._clear()
+            self._version = None
+
+
+class RankedMatch(NamedTuple):
+    recipe_id: int
+    coverage: float
+    matched_count: int
+    missing_count: int
+    expiring_count: int
+    missing_ingredients: List[str]
+
+
+class RecipeIndex(VersionedRecipeIndex):
+    """Maps ingredient names to the ids of the recipes using them"""
+
+    def __init__(self):
+        super().__init__()
+        self._postings: Dict[str, Set[int]] = {}
+        self._recipe_names: Dict[int, FrozenSet[str]] = {}
+        self._without_ingredients: Set[int] = set()
+
+    async def _fetch(self, db: AsyncSession, conditions) -> List[tuple]:
+        result = await db.execute(
+            select(models.Recipe.id, models.RecipeIngredient.name)
+            .outerjoin(models.RecipeIngredient)
+            .where(*conditions)
+        )
+        names_by_recipe: Dict[int, List[str]] = {}
+        for recipe_id, name in result:
+            names = names_by_recipe.setdefault(recipe_id, [])
+            if name is not None:
+                names.append(name)
+        return list(names_by_recipe.items())
+
+    def _add(self, recipe_id: int, names: Iterable[str]):
+        self._remove(recipe_id)
+        names = frozenset(names)
+        if not names:
+            self._without_ingredients.add(recipe_id)
+            return
+        for name in names:
+            self._postings.setdefault(name, set()).add(recipe_id)
+        self._recipe_names[recipe_id] = names
+
+    def _remove(self, recipe_id: int):
+        self._without_ingredients.discard(recipe_id)
+        for name in self._recipe_names.pop(recipe_id, ()):
+            posting = self._postings[name]
+            posting.discard(recipe_id)
+            if not posting:
+                del self._postings[name]
+
+    def _clear(self):
+        self._postings.clear()
+        self._recipe_names.clear()
+        self._without_ingredients.clear()
+
+    def add_recipe(self, recipe_id: int, names: Iterable[str]):
+        """Index (or re-index) a recipe by its normalized ingredient names"""
+        with self._lock:
+            if self._version is not None:
+                self._add(recipe_id, names)
+
+    def remove_recipe(self, recipe_id: int):
+        """Drop a recipe from the index"""
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _available_counts(self, names: Iterable[str]) -> Counter:
+        """Per recipe using any of `names`, how many of its ingredients are among them"""
+        counts = Counter()
+        for name in names:
+            counts.update(self._postings.get(name, ()))
+        return counts
+
+    def match(self, available_names: Iterable[str]) -> List[int]:
+        """Return ids of recipes whose ingredients are all available"""
+        with self._lock:
+            counts = self._available_counts(set(available_names))
+            recipe_names = self._recipe_names
+            matched = [recipe_id for recipe_id, count in counts.items() if count == len(recipe_names[recipe_id])]
+            return sorted(matched + list(self._without_ingredients))
+
+    def rank(
+        self,
+        available_names: Iterable[str],
+        expiring_names: Iterable[str] = (),
+        limit: int = 10,
+        max_missing: Optional[int] = None,
+    ) -> List[RankedMatch]:
+        """
+        Return the top `limit` recipes sharing at least one pantry ingredient,
+        best coverage first, then fewest missing, then most expiring-soon
+        ingredients used.
+        """
+        available_names = set(available_names)
+        with self._lock:
+            # Both walks touch only the postings of the pantry's own names
+            counts = self._available_counts(available_names)
+            expiring_counts = self._available_counts(available_names.intersection(expiring_names))
+            recipe_names = self._recipe_names
+
+            def scored():
+                for recipe_id, matched in counts.items():
+                    required = len(recipe_names[recipe_id])
+                    missing = required - matched
+                    if max_missing is not None and missing > max_missing:
+                        continue
+                    yield (matched / required, -missing, expiring_counts[recipe_id], -recipe_id)
+
+            top = heapq.nlargest(limit, scored())
+            return [
+                RankedMatch(
+                    recipe_id=-neg_id,
+                    coverage=coverage,
+                    matched_count=counts[-neg_id],
+                    missing_count=-neg_missing,
+                    expiring_count=expiring,
+                    missing_ingredients=sorted(recipe_names[-neg_id] - available_names),
+                )
+                for coverage, neg_missing, expiring, neg_id in top
+            ]
+
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,226 @@
+"""
+Recipe search: ranked full-text plus typo-tolerant name matching.
+
+On PostgreSQL, search runs in SQL against the generated `search_vector`
+column (name weighted above description), a pg_trgm index on names and
+the recipe_ingredients name index; see migration 4. Other backends
+(SQLite in development) use RecipeSearchIndex, an in-memory inverted
+index with the same scoring shape: term weights per field, plus
+trigram similarity on the name. Like the matching index it catches up
+with recipes other processes wrote or deleted before each search.
+"""
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .models import normalize_ingredient_name
+from .recipe_index import VersionedRecipeIndex
+
+# Same cutoff as pg_trgm.similarity_threshold's default
+SIMILARITY_THRESHOLD = 0.3
+
+# Field weights, mirroring setweight() A/B in the tsvector plus ingredient hits
+NAME_WEIGHT = 1.0
+INGREDIENT_WEIGHT = 0.6
+DESCRIPTION_WEIGHT = 0.4
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lowercase words with a crude plural strip (tomatoes -> tomato)"""
+    words = []
+    for word in _WORD.findall((value or "").lower()):
+        if len(word) > 3 and word.endswith("es") and word[-3] in "sxo":
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def trigrams(value: str) -> Set[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces before, one after"""
+    grams = set()
+    for word in _WORD.findall(value.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def ingredient_terms(query: str) -> List[str]:
+    """Normalized ingredient names a query could mean: the phrase, each word and its singular"""
+    phrase = normalize_ingredient_name(query)
+    return list(dict.fromkeys([phrase, *phrase.split(), " ".join(tokenize(phrase)), *tokenize(phrase)]))
+
+
+# ------------------------------------------------------------
+# PostgreSQL
+# ------------------------------------------------------------
+
+# Each candidate branch uses its own index; scoring only touches the union
+_SEARCH_SQL = text("""
+    WITH q AS (SELECT websearch_to_tsquery('english', :q) AS tsq),
+    candidates AS (
+        SELECT r.id FROM recipes r, q WHERE r.search_vector @@ q.tsq
+        UNION
+        SELECT r.id FROM recipes r WHERE r.name % :q
+        UNION
+        SELECT ri.recipe_id FROM recipe_ingredients ri WHERE ri.name = ANY(:terms)
+    )
+    SELECT r.id,
+           ts_rank(r.search_vector, q.tsq)
+           + similarity(r.name, :q)
+           + :ingredient_weight * (
+               SELECT count(*) FROM recipe_ingredients ri
+               WHERE ri.recipe_id = r.id AND ri.name = ANY(:terms)
+           ) AS score
+    FROM candidates c JOIN recipes r ON r.id = c.id, q
+    ORDER BY score DESC, r.id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+async def search_postgres(db: AsyncSession, query: str, offset: int, limit: int) -> List[int]:
+    result = await db.execute(_SEARCH_SQL, {
+        "q": query,
+        "terms": ingredient_terms(query),
+        "ingredient_weight": INGREDIENT_WEIGHT,
+        "limit": limit,
+        "offset": offset,
+    })
+    return [recipe_id for recipe_id, _ in result]
+
+
+# ------------------------------------------------------------
+# In-memory fallback
+# ------------------------------------------------------------
+
+class RecipeSearchIndex(VersionedRecipeIndex):
+    """Term and trigram postings over recipe names, descriptions and ingredients"""
+
+    def __init__(self):
+        super().__init__()
+        self._terms: Dict[str, Dict[int, float]] = {}  # term -> recipe id -> weight
+        self._trigrams: Dict[str, Set[int]] = {}  # name trigram -> recipe ids
+        self._recipe_terms: Dict[int, Set[str]] = {}
+        self._name_trigrams: Dict[int, Set[str]] = {}
+        self._ingredients: Dict[str, Set[int]] = {}  # ingredient name -> recipe ids
+        self._recipe_ingredients: Dict[int, Set[str]] = {}
+
+    def _add(self, recipe_id: int, name: str, description: Optional[str], ingredient_names: Iterable[str]):
+        self._remove(recipe_id)
+        weights: Dict[str, float] = {}
+        for words, weight in (
+            (tokenize(name), NAME_WEIGHT),
+            (tokenize(description), DESCRIPTION_WEIGHT),
+        ):
+            for word in words:
+                weights[word] = max(weights.get(word, 0.0), weight)
+        for term, weight in weights.items():
+            self._terms.setdefault(term, {})[recipe_id] = weight
+        self._recipe_terms[recipe_id] = set(weights)
+
+        grams = trigrams(name)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(recipe_id)
+        self._name_trigrams[recipe_id] = grams
+
+        names = set(ingredient_names)
+        for ingredient in names:
+            self._ingredients.setdefault(ingredient, set()).add(recipe_id)
+        self._recipe_ingredients[recipe_id] = names
+
+    def _remove(self, recipe_id: int):
+        for term in self._recipe_terms.pop(recipe_id, ()):
+            posting = self._terms[term]
+            posting.pop(recipe_id, None)
+            if not posting:
+                del self._terms[term]
+        for gram in self._name_trigrams.pop(recipe_id, ()):
+            posting = self._trigrams[gram]
+            posting.discard(recipe_id)
+            if not posting:
+                del self._trigrams[gram]
+        for ingredient in self._recipe_ingredients.pop(recipe_id, ()):
+            posting = self._ingredients[ingredient]
+            posting.discard(recipe_id)
+            if not posting:
+                del self._ingredients[ingredient]
+
+    def _clear(self):
+        self._terms.clear()
+        self._trigrams.clear()
+        self._recipe_terms.clear()
+        self._name_trigrams.clear()
+        self._ingredients.clear()
+        self._recipe_ingredients.clear()
+
+    async def _fetch(self, db: AsyncSession, conditions) -> List[tuple]:
+        recipes = (await db.execute(
+            select(models.Recipe.id, models.Recipe.name, models.Recipe.description).where(*conditions)
+        )).all()
+        ingredients: Dict[int, List[str]] = {}
+        for recipe_id, name in await db.execute(
+            select(models.RecipeIngredient.recipe_id, models.RecipeIngredient.name)
+            .join(models.Recipe)
+            .where(*conditions)
+        ):
+            ingredients.setdefault(recipe_id, []).append(name)
+        return [
+            (recipe_id, name, description, ingredients.get(recipe_id, ()))
+            for recipe_id, name, description in recipes
+        ]
+
+    def add_recipe(self, recipe_id: int, name: str, description: Optional[str], ingredient_names: Iterable[str]):
+        """Index (or re-index) a recipe"""
+        with self._lock:
+            if self._version is not None:
+                self._add(recipe_id, name, description, ingredient_names)
+
+    def remove_recipe(self, recipe_id: int):
+        """Drop a recipe from the index"""
+        with self._lock:
+            self._remove(recipe_id)
+
+    def search(self, query: str, offset: int, limit: int) -> List[int]:
+        """Recipe ids ranked by term weights, ingredient hits and name similarity"""
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for term in set(tokenize(query)):
+                for recipe_id, weight in self._terms.get(term, {}).items():
+                    scores[recipe_id] = scores.get(recipe_id, 0.0) + weight
+
+            for ingredient in ingredient_terms(query):
+                for recipe_id in self._ingredients.get(ingredient, ()):
+                    scores[recipe_id] = scores.get(recipe_id, 0.0) + INGREDIENT_WEIGHT
+
+            query_grams = trigrams(query)
+            shared: Dict[int, int] = {}
+            for gram in query_grams:
+                for recipe_id in self._trigrams.get(gram, ()):
+                    shared[recipe_id] = shared.get(recipe_id, 0) + 1
+            for recipe_id, count in shared.items():
+                similarity = count / (len(query_grams) + len(self._name_trigrams[recipe_id]) - count)
+                if similarity >= SIMILARITY_THRESHOLD or recipe_id in scores:
+                    scores[recipe_id] = scores.get(recipe_id, 0.0) + similarity
+
+        ranked: List[Tuple[float, int]] = heapq.nsmallest(
+            offset + limit, ((-score, recipe_id) for recipe_id, score in scores.items())
+        )
+        return [recipe_id for _, recipe_id in ranked[offset:]]
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+async def search_recipes(db: AsyncSession, query: str, offset: int, limit: int) -> List[int]:
+    """Ranked recipe ids for a query, using the database's own search when it has one"""
+    if db.bind.dialect.name == "postgresql":
+        return await search_postgres(db, query, offset, limit)
+    await recipe_search_index.ensure_loaded(db)
+    return recipe_search_index.search(query, offset, limit)
@@ -1,4 +1,4 @@
 # Routers package
-from . import ingredients, shopping_lists, recipes
+from . import auth, ingredients, shopping_lists, recipes, metrics, export, imports, sync, profiles
 
-__all__ = ['ingredients', 'shopping_lists', 'recipes']
+__all__ = ['auth', 'ingredients', 'shopping_lists', 'recipes', 'metrics', 'export', 'imports', 'sync', 'profiles']
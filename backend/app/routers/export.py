@@ -0,0 +1,150 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from typing import AsyncIterator, List, NamedTuple, Optional
+from datetime import date, datetime
+import csv
+import io
+import json
+import os
+from .. import models, schemas
+from ..auth import CurrentUser, get_current_user, is_admin
+from ..database import AsyncSessionLocal
+from ..serialization import dumps, schema_columns
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+class ExportSpec(NamedTuple):
+    model: type
+    columns: List  # parent columns, id first
+    children: List  # child columns, nested under child_field
+    child_field: Optional[str]
+    join: Optional[object]
+    order_by: List
+
+def _columns(model, schema):
+    columns = schema_columns(model, schema)
+    columns.sort(key=lambda column: column.key != "id")
+    return columns + [model.user_id]
+
+EXPORTS = {
+    "ingredients": ExportSpec(
+        models.Ingredient,
+        _columns(models.Ingredient, schemas.Ingredient),
+        [], None, None,
+        [models.Ingredient.id],
+    ),
+    "recipes": ExportSpec(
+        models.Recipe,
+        _columns(models.Recipe, schemas.Recipe),
+        [models.RecipeIngredient.display_name.label("name"), models.RecipeIngredient.quantity, models.RecipeIngredient.unit],
+        "ingredient_items",
+        (models.RecipeIngredient, models.RecipeIngredient.recipe_id == models.Recipe.id),
+        [models.Recipe.id, models.RecipeIngredient.position],
+    ),
+    "shopping-lists": ExportSpec(
+        models.ShoppingList,
+        _columns(models.ShoppingList, schemas.ShoppingList),
+        [
+            models.ShoppingItem.id.label("item_id"),
+            models.ShoppingItem.item_name,
+            models.ShoppingItem.quantity,
+            models.ShoppingItem.unit,
+            models.ShoppingItem.is_purchased,
+        ],
+        "items",
+        (models.ShoppingItem, models.ShoppingItem.shopping_list_id == models.ShoppingList.id),
+        [models.ShoppingList.id, models.ShoppingItem.id],
+    ),
+}
+
+async def _records(spec: ExportSpec, user_id: Optional[int]) -> AsyncIterator[List[dict]]:
+    """
+    Yield batches of export records from a server-side cursor.
+    Child rows arrive right after their parent (ordered join), so each
+    record is complete once the next parent id shows up.
+    """
+    statement = select(*spec.columns, *spec.children)
+    if spec.join is not None:
+        statement = statement.outerjoin(*spec.join)
+    if user_id is not None:
+        statement = statement.where(spec.model.user_id == user_id)
+    statement = statement.order_by(*spec.order_by).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    parent_names = [column.key for column in spec.columns]
+    child_names = [column.key for column in spec.children]
+    split = len(parent_names)
+
+    # The request's session is gone by the time the body streams, so open one here
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement)
+        current = None
+        async for partition in result.partitions():
+            batch = []
+            for row in partition:
+                if current is None or current["id"] != row[0]:
+                    if current is not None:
+                        batch.append(current)
+                    current = dict(zip(parent_names, row[:split]))
+                    if spec.child_field:
+                        current[spec.child_field] = []
+                child = row[split:]
+                if child and child[0] is not None:
+                    current[spec.child_field].append(dict(zip(child_names, child)))
+            if batch:
+                yield batch
+        if current is not None:
+            yield [current]
+
+async def _ndjson(records: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for batch in records:
+        yield b"".join(dumps(record) + b"\n" for record in batch)
+
+def _csv_value(value):
+    # Same ISO timestamps as the JSON output
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+async def _csv(spec: ExportSpec, records: AsyncIterator[List[dict]]) -> AsyncIterator[str]:
+    """One line per record; nested children are written as a JSON column"""
+    fields = [column.key for column in spec.columns] + ([spec.child_field] if spec.child_field else [])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for batch in records:
+        for record in batch:
+            if spec.child_field:
+                record[spec.child_field] = json.dumps(record[spec.child_field], default=str)
+            writer.writerow([_csv_value(record[field]) for field in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/{resource}")
+async def export_resource(
+    resource: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    all_users: bool = False,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Stream ingredients, recipes or shopping-lists as NDJSON or CSV"""
+    spec = EXPORTS.get(resource)
+    if spec is None:
+        raise HTTPException(status_code=404, detail="Unknown export resource")
+    if all_users and not is_admin(current_user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    records = _records(spec, None if all_users else current_user.id)
+    if format == "csv":
+        body, media_type = _csv(spec, records), "text/csv"
+    else:
+        body, media_type = _ndjson(records), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{format}"'},
+    )
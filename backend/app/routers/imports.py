@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+import io
+from .. import schemas
+from ..auth import CurrentUser, get_current_user
+from ..importer import import_records, read_records
+from ..recipe_index import recipe_index
+from ..recipe_search import recipe_search_index
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+@router.post("/{resource}", response_model=schemas.ImportReport)
+async def import_resource(
+    resource: str,
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(ndjson|csv)$"),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Bulk import ingredients or recipes from an NDJSON or CSV upload"""
+    if resource not in ("ingredients", "recipes"):
+        raise HTTPException(status_code=404, detail="Unknown import resource")
+    format = format or ("csv" if (file.filename or "").endswith(".csv") else "ndjson")
+
+    # Parsing and loading are blocking; run them off the event loop
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        report = await run_in_threadpool(
+            import_records, read_records(stream, format), resource, current_user.id
+        )
+    except ValueError as e:  # unparseable NDJSON/CSV line
+        raise HTTPException(status_code=400, detail=f"Invalid {format} data: {e}")
+    finally:
+        stream.detach()
+
+    if resource == "recipes":
+        recipe_index.invalidate()
+        recipe_search_index.invalidate()
+    return report
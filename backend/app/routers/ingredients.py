@@ -1,79 +1,279 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, timedelta
 from .. import models, schemas
-from ..auth import get_current_user
-from ..database import get_db
+from ..auth import CurrentUser, get_current_user
+from ..cache import response_cache, table_version
+from ..database import get_async_db
+from ..pagination import (
+    MAX_PAGE_SIZE, page_response, paginate, projection_columns, projection_response
+)
+from ..serialization import rows_to_dicts, schema_columns
+from ..sync import record_deletions
+from ..upsert import upsert_insert
+from .. import units
 
 router = APIRouter(prefix="/ingredients", tags=["ingredients"])
 
-@router.get("/", response_model=List[schemas.Ingredient])
-def get_ingredients(location: str = None, db: Session = Depends(get_db)):
-    """Get all ingredients, optionally filtered by location (Fridge/Pantry)"""
-    current_user: models.User = Depends(get_current_user)
-    query = db.query(models.Ingredient)
-    if location:
-        query = query.filter(models.Ingredient.location == location)
-    return query.all()
+# Bulk upsert fields that are only replaced when the request sets them
+OPTIONAL_FIELDS = ("expiry_date",)
 
-@router.get("/{ingredient_id}", response_model=schemas.Ingredient)
-def get_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
-    """Get a specific ingredient by ID"""
-    current_user: models.User = Depends(get_current_user)
-    ingredient = db.query(models.Ingredient).filter(models.Ingredient.id == ingredient_id).first()
+async def _get_owned(db: AsyncSession, ingredient_id: int, current_user: CurrentUser) -> models.Ingredient:
+    """Load an ingredient belonging to the current user, or 404"""
+    ingredient = await db.scalar(
+        select(models.Ingredient).where(
+            models.Ingredient.id == ingredient_id,
+            models.Ingredient.user_id == current_user.id
+        )
+    )
     if not ingredient:
         raise HTTPException(status_code=404, detail="Ingredient not found")
     return ingredient
 
+@router.get("/", response_model=List[schemas.Ingredient])
+async def get_ingredients(
+    request: Request,
+    location: str = None,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get ingredients page by page, optionally filtered by location (Fridge/Pantry)"""
+    columns = projection_columns(models.Ingredient, schemas.Ingredient, fields)
+
+    async def build():
+        statement = select(*(columns or schema_columns(models.Ingredient, schemas.Ingredient)))
+        # Served by ix_ingredients_user_location (user_id, location, id)
+        statement = statement.where(models.Ingredient.user_id == current_user.id)
+        if location:
+            statement = statement.where(models.Ingredient.location == location)
+        rows, next_cursor = await paginate(db, statement, models.Ingredient.id, cursor, limit, projected=True)
+        if columns:
+            return projection_response(rows, next_cursor)
+        return page_response(rows_to_dicts(rows, schemas.Ingredient), next_cursor)
+
+    return await response_cache.respond(
+        request, db, ("ingredients", current_user.id),
+        table_version(models.Ingredient, models.Ingredient.user_id == current_user.id), build,
+    )
+
+# Bulk operations (registered before the /{ingredient_id} routes)
+@router.post("/bulk", response_model=List[schemas.IngredientBulkResult])
+async def bulk_upsert_ingredients(
+    payload: schemas.IngredientBulkUpsert,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Create ingredients or add to existing ones by name, one statement per set of given fields"""
+    # One row per name: ON CONFLICT can't touch the same row twice in a statement
+    rows = {}
+    given = {}  # name -> optional fields the request set, even to null
+    try:
+        for item in payload.items:
+            row = rows.get(item.name)
+            if row is None:
+                rows[item.name] = {**item.model_dump(), "user_id": current_user.id}
+                given[item.name] = set()
+            else:
+                row.update(item.model_dump(exclude={"quantity", "unit"}, exclude_unset=True))
+                row["quantity"] += units.convert(item.quantity, item.unit, row["unit"])
+            given[item.name] |= item.model_fields_set & set(OPTIONAL_FIELDS)
+
+        # Quantities are added in the unit already stored for that ingredient
+        existing = dict((await db.execute(
+            select(models.Ingredient.name, models.Ingredient.unit).where(
+                models.Ingredient.user_id == current_user.id,
+                models.Ingredient.name.in_(list(rows))
+            )
+        )).all())
+        for name, stored_unit in existing.items():
+            row = rows[name]
+            row["quantity"] = units.convert(row["quantity"], row["unit"], stored_unit)
+            row["unit"] = stored_unit
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    groups = {}
+    for name, row in rows.items():
+        groups.setdefault(frozenset(given[name]), []).append(row)
+
+    table = models.Ingredient.__table__
+    ingredients = []
+    for fields, group in groups.items():
+        statement = upsert_insert(db.bind.dialect.name, models.Ingredient)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.name],
+            set_={
+                "quantity": table.c.quantity + statement.excluded.quantity,
+                "category": statement.excluded.category,
+                "location": statement.excluded.location,
+                # An omitted expiry date keeps the stored one; an explicit null clears it
+                **{name: statement.excluded[name] for name in fields},
+                "updated_at": models.utc_now(),
+                "row_version": models.next_row_version(),
+            },
+        ).returning(models.Ingredient)
+        ingredients += (await db.scalars(
+            statement, group, execution_options={"populate_existing": True}
+        )).all()
+    await db.commit()
+
+    by_name = {ingredient.name: ingredient for ingredient in ingredients}
+    return [
+        schemas.IngredientBulkResult(
+            status="updated" if name in existing else "created",
+            id=by_name[name].id,
+            name=name,
+            ingredient=schemas.Ingredient.model_validate(by_name[name]),
+        )
+        for name in rows
+    ]
+
+@router.put("/bulk", response_model=List[schemas.IngredientBulkResult])
+async def bulk_update_ingredients(
+    payload: schemas.IngredientBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Update many ingredients by id in one transaction"""
+    ids = [item.id for item in payload.items]
+    owned = set(await db.scalars(
+        select(models.Ingredient.id).where(
+            models.Ingredient.user_id == current_user.id,
+            models.Ingredient.id.in_(ids)
+        )
+    ))
+    # updated_at and row_version come from the columns' onupdate
+    changes = [
+        item.model_dump(exclude_unset=True)
+        for item in payload.items
+        if item.id in owned
+    ]
+    if changes:
+        # ORM bulk UPDATE by primary key: one executemany per distinct column set
+        await db.execute(update(models.Ingredient), changes)
+        await db.commit()
+
+    updated = {
+        ingredient.id: ingredient
+        for ingredient in await db.scalars(
+            select(models.Ingredient)
+            .where(models.Ingredient.id.in_(owned))
+            .execution_options(populate_existing=True)
+        )
+    }
+    return [
+        schemas.IngredientBulkResult(
+            status="updated", id=item_id, name=updated[item_id].name,
+            ingredient=schemas.Ingredient.model_validate(updated[item_id]),
+        )
+        if item_id in updated
+        else schemas.IngredientBulkResult(status="not_found", id=item_id)
+        for item_id in ids
+    ]
+
+@router.delete("/bulk", response_model=List[schemas.IngredientBulkResult])
+async def bulk_delete_ingredients(
+    payload: schemas.IngredientBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Delete many ingredients by id in one statement"""
+    deleted = set(await db.scalars(
+        delete(models.Ingredient)
+        .where(models.Ingredient.user_id == current_user.id, models.Ingredient.id.in_(payload.ids))
+        .returning(models.Ingredient.id)
+    ))
+    await record_deletions(db, models.Ingredient.__tablename__, [(item_id, current_user.id) for item_id in deleted])
+    await db.commit()
+    return [
+        schemas.IngredientBulkResult(status="deleted" if item_id in deleted else "not_found", id=item_id)
+        for item_id in payload.ids
+    ]
+
+@router.get("/{ingredient_id}", response_model=schemas.Ingredient)
+async def get_ingredient(
+    ingredient_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get a specific ingredient by ID"""
+    return await _get_owned(db, ingredient_id, current_user)
+
 @router.post("/", response_model=schemas.Ingredient)
-def create_ingredient(ingredient: schemas.IngredientCreate, db: Session = Depends(get_db)):
+async def create_ingredient(
+    ingredient: schemas.IngredientCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Create a new ingredient"""
     # Check if ingredient already exists
-    existing = db.query(models.Ingredient).filter(models.Ingredient.name == ingredient.name).first()
+    existing = await db.scalar(
+        select(models.Ingredient.id).where(
+            models.Ingredient.user_id == current_user.id,
+            models.Ingredient.name == ingredient.name
+        )
+    )
     if existing:
         raise HTTPException(status_code=400, detail="Ingredient already exists")
-    
-    db_ingredient = models.Ingredient(**ingredient.model_dump())
+
+    db_ingredient = models.Ingredient(**ingredient.model_dump(), user_id=current_user.id)
     db.add(db_ingredient)
-    db.commit()
-    db.refresh(db_ingredient)
+    await db.commit()
+    await db.refresh(db_ingredient)
     return db_ingredient
 
 @router.put("/{ingredient_id}", response_model=schemas.Ingredient)
-def update_ingredient(ingredient_id: int, ingredient: schemas.IngredientUpdate, db: Session = Depends(get_db)):
+async def update_ingredient(
+    ingredient_id: int,
+    ingredient: schemas.IngredientUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Update an ingredient"""
-    db_ingredient = db.query(models.Ingredient).filter(models.Ingredient.id == ingredient_id).first()
-    if not db_ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    
+    db_ingredient = await _get_owned(db, ingredient_id, current_user)
+
     update_data = ingredient.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_ingredient, key, value)
-    
-    db.commit()
-    db.refresh(db_ingredient)
+
+    await db.commit()
+    await db.refresh(db_ingredient)
     return db_ingredient
 
 @router.delete("/{ingredient_id}")
-def delete_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
+async def delete_ingredient(
+    ingredient_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Delete an ingredient"""
-    db_ingredient = db.query(models.Ingredient).filter(models.Ingredient.id == ingredient_id).first()
-    if not db_ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    
-    db.delete(db_ingredient)
-    db.commit()
+    db_ingredient = await _get_owned(db, ingredient_id, current_user)
+
+    await db.delete(db_ingredient)
+    await record_deletions(db, models.Ingredient.__tablename__, [(ingredient_id, current_user.id)])
+    await db.commit()
     return {"message": "Ingredient deleted successfully"}
 
 @router.get("/expiring/soon", response_model=List[schemas.Ingredient])
-def get_expiring_soon(days: int = 7, db: Session = Depends(get_db)):
-    """Get ingredients expiring within specified days"""
-    current_user: models.User = Depends(get_current_user)
-    from datetime import datetime, timedelta
-    expiry_threshold = datetime.now().date() + timedelta(days=days)
-    
-    ingredients = db.query(models.Ingredient).filter(
-        models.Ingredient.expiry_date.isnot(None),
-        models.Ingredient.expiry_date <= expiry_threshold
-    ).all()
-    return ingredients
+async def get_expiring_soon(
+    days: int = 7,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get ingredients expiring within specified days, soonest first"""
+    expiry_threshold = date.today() + timedelta(days=days)
+
+    # Range scan on the partial index ix_ingredients_user_expiry
+    ingredients = await db.scalars(
+        select(models.Ingredient).where(
+            models.Ingredient.user_id == current_user.id,
+            models.Ingredient.expiry_date.isnot(None),
+            models.Ingredient.expiry_date <= expiry_threshold
+        ).order_by(models.Ingredient.expiry_date)
+    )
+    return ingredients.all()
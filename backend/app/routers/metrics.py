@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from ..cache import response_cache
+from ..database import async_pool_metrics, sync_pool_metrics
+from ..metrics import CONTENT_TYPE, registry
+from ..passwords import password_hasher
+from ..pubsub import broker
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("")
+async def get_prometheus_metrics():
+    """Request, query and pool metrics in Prometheus text format"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """Connection pool gauges, checkout counts and wait times per engine"""
+    return {
+        metrics.name: metrics.snapshot()
+        for metrics in (sync_pool_metrics, async_pool_metrics)
+    }
+
+@router.get("/password-hashing")
+def get_password_hashing_metrics():
+    """bcrypt pool queue depth and throughput"""
+    return password_hasher.snapshot()
+
+@router.get("/response-cache")
+def get_response_cache_metrics():
+    """Conditional GET and body cache hit counts"""
+    return response_cache.snapshot()
+
+@router.get("/pubsub")
+def get_pubsub_metrics():
+    """Live update subscribers in this process"""
+    return {"broker": type(broker).__name__, "subscribers": broker.subscriber_count()}
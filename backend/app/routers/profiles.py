@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List
+from ..auth import CurrentUser, get_current_admin
+from ..profiling import profiler
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+@router.get("/")
+def get_profiles(current_user: CurrentUser = Depends(get_current_admin)) -> List[dict]:
+    """Recent slow or explicitly profiled requests, newest first"""
+    return profiler.summaries()
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: int, current_user: CurrentUser = Depends(get_current_admin)) -> dict:
+    """One profile with its SQL statements and cProfile summary"""
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return record
@@ -1,78 +1,222 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import date, timedelta
 import json
 from .. import models, schemas
-from ..database import get_db
+from ..auth import CurrentUser, get_current_user
+from ..cache import response_cache
+from ..database import get_async_db
+from ..pagination import (
+    MAX_PAGE_SIZE, page_response, paginate, projection_columns, projection_response
+)
+from ..models import normalize_ingredient_name
+from ..recipe_index import recipe_index, recipes_version_query
+from ..recipe_search import recipe_search_index, search_recipes
+from ..serialization import group_rows, rows_to_dicts, schema_columns
+from ..sync import record_deletions
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
-@router.get("/", response_model=List[schemas.Recipe])
-def get_recipes(healthy_only: bool = False, db: Session = Depends(get_db)):
-    """Get all recipes, optionally filtered by healthy recipes"""
-    query = db.query(models.Recipe)
-    if healthy_only:
-        query = query.filter(models.Recipe.is_healthy == True)
-    return query.all()
+def _select_recipes():
+    """Recipes with ingredients eager-loaded (async sessions can't lazy-load)"""
+    return select(models.Recipe).options(selectinload(models.Recipe.ingredient_items))
 
-@router.get("/{recipe_id}", response_model=schemas.Recipe)
-def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    """Get a specific recipe by ID"""
-    recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
+async def _get_owned(db: AsyncSession, recipe_id: int, current_user: CurrentUser) -> models.Recipe:
+    """Load a recipe belonging to the current user, or 404"""
+    recipe = await db.scalar(
+        _select_recipes().where(models.Recipe.id == recipe_id, models.Recipe.user_id == current_user.id)
+    )
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     return recipe
 
+async def recipe_dicts(db: AsyncSession, rows, schema=schemas.Recipe) -> List[dict]:
+    """Recipe response dicts from column rows, with all their ingredients read in one query"""
+    if not rows:
+        return []
+    items = group_rows((await db.execute(
+        select(
+            models.RecipeIngredient.recipe_id,
+            models.RecipeIngredient.display_name,
+            models.RecipeIngredient.quantity,
+            models.RecipeIngredient.unit,
+        )
+        .where(models.RecipeIngredient.recipe_id.in_([row.id for row in rows]))
+        .order_by(models.RecipeIngredient.recipe_id, models.RecipeIngredient.position)
+    )).all())
+    return rows_to_dicts(rows, schema, {
+        "ingredients": lambda row: json.dumps([item.display_name for item in items.get(row.id, ())]),
+        "ingredient_items": lambda row: [
+            {"name": item.display_name, "quantity": item.quantity, "unit": item.unit}
+            for item in items.get(row.id, ())
+        ],
+    })
+
+@router.get("/", response_model=List[schemas.Recipe])
+async def get_recipes(
+    request: Request,
+    healthy_only: bool = False,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get recipes page by page, optionally filtered by healthy recipes"""
+    columns = projection_columns(models.Recipe, schemas.Recipe, fields)
+
+    async def build():
+        statement = select(*(columns or schema_columns(models.Recipe, schemas.Recipe)))
+        if healthy_only:
+            statement = statement.where(models.Recipe.is_healthy == True)
+        rows, next_cursor = await paginate(db, statement, models.Recipe.id, cursor, limit, projected=True)
+        if columns:
+            return projection_response(rows, next_cursor)
+        return page_response(await recipe_dicts(db, rows), next_cursor)
+
+    # Recipes are shared, so their version is two index seeks rather than a table-wide sum
+    return await response_cache.respond(request, db, ("recipes",), recipes_version_query(), build)
+
+@router.get("/search", response_model=List[schemas.Recipe])
+async def search_recipes_route(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search recipes by name, description and ingredients, best matches first"""
+    # Results are ranked, so the cursor here is an offset into the ranking
+    offset = cursor or 0
+    recipe_ids = await search_recipes(db, q, offset, limit + 1)
+    next_cursor = offset + limit if len(recipe_ids) > limit else None
+    recipe_ids = recipe_ids[:limit]
+    if not recipe_ids:
+        return page_response([], None)
+
+    rows = (await db.execute(
+        select(*schema_columns(models.Recipe, schemas.Recipe)).where(models.Recipe.id.in_(recipe_ids))
+    )).all()
+    rank = {recipe_id: position for position, recipe_id in enumerate(recipe_ids)}
+    rows.sort(key=lambda row: rank[row.id])
+    return page_response(await recipe_dicts(db, rows), next_cursor)
+
+@router.get("/{recipe_id}", response_model=schemas.Recipe)
+async def get_recipe(
+    recipe_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get a specific recipe by ID"""
+    return await _get_owned(db, recipe_id, current_user)
+
 @router.post("/", response_model=schemas.Recipe)
-def create_recipe(recipe: schemas.RecipeCreate, db: Session = Depends(get_db)):
+async def create_recipe(
+    recipe: schemas.RecipeCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Create a new recipe"""
-    db_recipe = models.Recipe(**recipe.model_dump())
+    try:
+        db_recipe = models.Recipe(**recipe.model_dump(exclude={"ingredient_items"}), user_id=current_user.id)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid ingredients JSON")
+    if recipe.ingredient_items is not None:
+        db_recipe.set_ingredients([item.model_dump() for item in recipe.ingredient_items])
     db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
+    await db.commit()
+    recipe_index.add_recipe(db_recipe.id, [item.name for item in db_recipe.ingredient_items])
+    recipe_search_index.add_recipe(
+        db_recipe.id, db_recipe.name, db_recipe.description, [item.name for item in db_recipe.ingredient_items]
+    )
     return db_recipe
 
 @router.delete("/{recipe_id}")
-def delete_recipe(recipe_id: int, db: Session = Depends(get_db)):
+async def delete_recipe(
+    recipe_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Delete a recipe"""
-    db_recipe = db.query(models.Recipe).filter(models.Recipe.id == recipe_id).first()
-    if not db_recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    
-    db.delete(db_recipe)
-    db.commit()
+    db_recipe = await _get_owned(db, recipe_id, current_user)
+
+    await db.delete(db_recipe)
+    await record_deletions(db, models.Recipe.__tablename__, [(recipe_id, current_user.id)])
+    await db.commit()
+    recipe_index.remove_recipe(recipe_id)
+    recipe_search_index.remove_recipe(recipe_id)
     return {"message": "Recipe deleted successfully"}
 
 @router.get("/match/ingredients", response_model=List[schemas.Recipe])
-def find_matching_recipes(db: Session = Depends(get_db)):
-    """Find recipes that can be made with available ingredients"""
-    # Get all available ingredients
-    available_ingredients = db.query(models.Ingredient).filter(
-        models.Ingredient.quantity > 0
-    ).all()
-    
-    available_names = {ing.name.lower() for ing in available_ingredients}
-    
-    # Get all recipes
-    all_recipes = db.query(models.Recipe).all()
-    matching_recipes = []
-    
-    for recipe in all_recipes:
-        try:
-            recipe_ingredients = json.loads(recipe.ingredients)
-            # Check if all recipe ingredients are available
-            required_ingredients = {ing.lower() for ing in recipe_ingredients}
-            
-            # Calculate match percentage
-            if required_ingredients.issubset(available_names):
-                matching_recipes.append(recipe)
-        except json.JSONDecodeError:
-            continue
-    
-    return matching_recipes
+async def find_matching_recipes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Find recipes that can be made with the current user's ingredients"""
+    await recipe_index.ensure_loaded(db)
+
+    # Only the pantry names are needed, not full Ingredient rows
+    available_names = {
+        normalize_ingredient_name(name)
+        for name in await db.scalars(
+            select(models.Ingredient.name).where(
+                models.Ingredient.user_id == current_user.id, models.Ingredient.quantity > 0
+            )
+        )
+    }
+
+    matching_ids = recipe_index.match(available_names)
+    if not matching_ids:
+        return []
+    recipes = await db.scalars(_select_recipes().where(models.Recipe.id.in_(matching_ids)))
+    return recipes.all()
+
+@router.get("/match/ranked", response_model=List[schemas.RecipeMatch])
+async def rank_matching_recipes(
+    limit: int = Query(10, ge=1, le=100),
+    max_missing: Optional[int] = Query(None, ge=0),
+    expiring_days: int = Query(3, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Rank recipes by how much of them can be made with the current user's ingredients"""
+    await recipe_index.ensure_loaded(db)
+
+    expiry_threshold = date.today() + timedelta(days=expiring_days)
+    available_names = set()
+    expiring_names = set()
+    pantry = await db.execute(
+        select(models.Ingredient.name, models.Ingredient.expiry_date).where(
+            models.Ingredient.user_id == current_user.id, models.Ingredient.quantity > 0
+        )
+    )
+    for name, expiry_date in pantry:
+        name = normalize_ingredient_name(name)
+        available_names.add(name)
+        if expiry_date is not None and expiry_date <= expiry_threshold:
+            expiring_names.add(name)
+
+    ranked = recipe_index.rank(available_names, expiring_names, limit=limit, max_missing=max_missing)
+    if not ranked:
+        return []
+    recipes = {
+        recipe.id: recipe
+        for recipe in await db.scalars(
+            _select_recipes().where(models.Recipe.id.in_([match.recipe_id for match in ranked]))
+        )
+    }
+    return [
+        schemas.RecipeMatch(recipe=schemas.Recipe.model_validate(recipes[match.recipe_id]), **match._asdict())
+        for match in ranked
+        if match.recipe_id in recipes
+    ]
 
 @router.post("/seed-sample")
-def seed_sample_recipes(db: Session = Depends(get_db)):
+async def seed_sample_recipes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Seed database with sample healthy recipes"""
     sample_recipes = [
         {
@@ -107,12 +251,20 @@ def seed_sample_recipes(db: Session = Depends(get_db)):
         }
     ]
     
-    for recipe_data in sample_recipes:
-        # Check if recipe already exists
-        existing = db.query(models.Recipe).filter(models.Recipe.name == recipe_data["name"]).first()
-        if not existing:
-            db_recipe = models.Recipe(**recipe_data)
-            db.add(db_recipe)
-    
-    db.commit()
+    # One lookup for all names, then a single batched insert
+    existing = set(await db.scalars(
+        select(models.Recipe.name).where(
+            models.Recipe.user_id == current_user.id,
+            models.Recipe.name.in_([recipe["name"] for recipe in sample_recipes])
+        )
+    ))
+    db.add_all([
+        models.Recipe(**recipe_data, user_id=current_user.id)
+        for recipe_data in sample_recipes
+        if recipe_data["name"] not in existing
+    ])
+
+    await db.commit()
+    recipe_index.invalidate()
+    recipe_search_index.invalidate()
     return {"message": "Sample recipes seeded successfully"}
@@ -1,77 +1,409 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Integer, any_, bindparam, func, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+import asyncio
+from collections import defaultdict
+from datetime import date
 from .. import models, schemas
-from ..database import get_db
+from ..auth import CurrentUser, get_current_user, resolve_token
+from ..cache import response_cache
+from ..database import AsyncSessionLocal, get_async_db
+from ..meal_plan import aggregate_requirements, subtract_pantry
+from ..models import normalize_ingredient_name
+from ..pagination import (
+    MAX_PAGE_SIZE, page_response, paginate, projection_columns, projection_response
+)
+from ..pubsub import broker
+from ..serialization import dumps, group_rows, rows_to_dicts, schema_columns
+from ..sync import record_deletions
 
 router = APIRouter(prefix="/shopping-lists", tags=["shopping-lists"])
 
+# Comment line sent on idle event streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
+def _select_lists():
+    """Shopping lists with items batch-loaded in one extra SELECT ... IN (...)"""
+    return select(models.ShoppingList).options(selectinload(models.ShoppingList.items))
+
+def _item_id_in(db: AsyncSession, item_ids: List[int]):
+    """id = ANY(:item_ids) on PostgreSQL (one cached statement for any list length), IN elsewhere"""
+    if db.bind.dialect.name == "postgresql":
+        return models.ShoppingItem.id == any_(bindparam("item_ids", item_ids, type_=ARRAY(Integer)))
+    return models.ShoppingItem.id.in_(item_ids)
+
+def _channel(list_id: int) -> str:
+    return f"shopping-list:{list_id}"
+
+def _item_delta(item: models.ShoppingItem) -> dict:
+    return schemas.ShoppingItem.model_validate(item).model_dump()
+
+async def _list_changed(list_id: int, delta: dict):
+    """Push a change to the list's subscribers"""
+    await broker.publish(_channel(list_id), {"list_id": list_id, **delta})
+
+def _owned_list_ids(user_id: int):
+    """Subquery of the ids of a user's lists, to scope item statements"""
+    return select(models.ShoppingList.id).where(models.ShoppingList.user_id == user_id)
+
+async def _ensure_list_owned(db: AsyncSession, list_id: int, user_id: int):
+    """404 unless the list exists and belongs to the user (other users' lists look missing)"""
+    if not await db.scalar(
+        select(models.ShoppingList.id).where(models.ShoppingList.id == list_id, models.ShoppingList.user_id == user_id)
+    ):
+        raise HTTPException(status_code=404, detail="Shopping list not found")
+
 @router.get("/", response_model=List[schemas.ShoppingList])
-def get_shopping_lists(db: Session = Depends(get_db)):
-    """Get all shopping lists"""
-    return db.query(models.ShoppingList).all()
+async def get_shopping_lists(
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Get the current user's shopping lists page by page"""
+    columns = projection_columns(models.ShoppingList, schemas.ShoppingList, fields)
+    statement = select(*(columns or schema_columns(models.ShoppingList, schemas.ShoppingList))).where(
+        models.ShoppingList.user_id == current_user.id
+    )
+    rows, next_cursor = await paginate(db, statement, models.ShoppingList.id, cursor, limit, projected=True)
+    if columns:
+        return projection_response(rows, next_cursor)
+
+    item_columns = schema_columns(models.ShoppingItem, schemas.ShoppingItem)
+    items = (await db.execute(
+        select(*item_columns)
+        .where(models.ShoppingItem.shopping_list_id.in_([row.id for row in rows]))
+        .order_by(models.ShoppingItem.shopping_list_id, models.ShoppingItem.id)
+    )).all()
+    items_by_list = group_rows(items, key_index=item_columns.index(models.ShoppingItem.shopping_list_id))
+    return page_response(rows_to_dicts(rows, schemas.ShoppingList, {
+        "items": lambda row: rows_to_dicts(items_by_list.get(row.id, []), schemas.ShoppingItem),
+    }), next_cursor)
+
+@router.post("/from-recipes", response_model=schemas.ShoppingList)
+async def create_list_from_recipes(
+    payload: schemas.ShoppingListFromRecipes,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Create a shopping list with what the selected recipes need beyond current stock"""
+    multipliers = defaultdict(float)
+    for selection in payload.recipes:
+        multipliers[selection.recipe_id] += selection.servings_multiplier
+
+    # One pass over every selected recipe's ingredients (outer join spots unknown ids)
+    rows = (await db.execute(
+        select(
+            models.Recipe.id,
+            models.RecipeIngredient.name,
+            models.RecipeIngredient.quantity,
+            models.RecipeIngredient.unit,
+        )
+        .outerjoin(models.RecipeIngredient, models.RecipeIngredient.recipe_id == models.Recipe.id)
+        .where(models.Recipe.id.in_(list(multipliers)))
+    )).all()
+    if len({row[0] for row in rows}) != len(multipliers):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    required = aggregate_requirements(rows, multipliers)
+
+    # One pantry lookup, matched on normalized names (stored names keep the user's spelling)
+    pantry = []
+    needed = required.names()
+    if needed:
+        pantry = [
+            row for row in await db.execute(
+                select(models.Ingredient.name, models.Ingredient.quantity, models.Ingredient.unit).where(
+                    models.Ingredient.user_id == current_user.id, models.Ingredient.quantity > 0
+                )
+            )
+            if normalize_ingredient_name(row.name) in needed
+        ]
+    deficits = subtract_pantry(required, pantry)
+
+    db_list = await db.scalar(
+        insert(models.ShoppingList)
+        .values(name=payload.name or f"Meal plan {date.today().isoformat()}", user_id=current_user.id)
+        .returning(models.ShoppingList)
+    )
+    items = []
+    if deficits:
+        items = (await db.scalars(
+            insert(models.ShoppingItem).returning(models.ShoppingItem),
+            [
+                {
+                    "shopping_list_id": db_list.id,
+                    "item_name": deficit.name,
+                    "quantity": deficit.quantity,
+                    "unit": deficit.unit,
+                    "is_purchased": False,
+                }
+                for deficit in deficits
+            ]
+        )).all()
+    await db.commit()
+    return schemas.ShoppingList(id=db_list.id, name=db_list.name, created_at=db_list.created_at, items=items)
 
 @router.get("/{list_id}", response_model=schemas.ShoppingList)
-def get_shopping_list(list_id: int, db: Session = Depends(get_db)):
+async def get_shopping_list(
+    list_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Get a specific shopping list by ID"""
-    shopping_list = db.query(models.ShoppingList).filter(models.ShoppingList.id == list_id).first()
-    if not shopping_list:
-        raise HTTPException(status_code=404, detail="Shopping list not found")
-    return shopping_list
+    async def build():
+        shopping_list = await db.scalar(_select_lists().where(
+            models.ShoppingList.id == list_id, models.ShoppingList.user_id == current_user.id
+        ))
+        if not shopping_list:
+            raise HTTPException(status_code=404, detail="Shopping list not found")
+        return Response(
+            content=schemas.ShoppingList.model_validate(shopping_list).model_dump_json(),
+            media_type="application/json",
+        )
+
+    # Lists can't be renamed, so their items' versions cover the whole response
+    version = (
+        select(func.count(models.ShoppingItem.id), func.coalesce(func.sum(models.ShoppingItem.row_version), 0))
+        .select_from(models.ShoppingList)
+        .outerjoin(models.ShoppingItem, models.ShoppingItem.shopping_list_id == models.ShoppingList.id)
+        .where(models.ShoppingList.id == list_id, models.ShoppingList.user_id == current_user.id)
+        .group_by(models.ShoppingList.id)
+    )
+    return await response_cache.respond(request, db, ("shopping-list", list_id), version, build)
 
 @router.post("/", response_model=schemas.ShoppingList)
-def create_shopping_list(shopping_list: schemas.ShoppingListCreate, db: Session = Depends(get_db)):
+async def create_shopping_list(
+    shopping_list: schemas.ShoppingListCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Create a new shopping list"""
-    db_list = models.ShoppingList(**shopping_list.model_dump())
+    db_list = models.ShoppingList(**shopping_list.model_dump(), user_id=current_user.id, items=[])
     db.add(db_list)
-    db.commit()
-    db.refresh(db_list)
+    await db.commit()
     return db_list
 
 @router.delete("/{list_id}")
-def delete_shopping_list(list_id: int, db: Session = Depends(get_db)):
+async def delete_shopping_list(
+    list_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Delete a shopping list"""
-    db_list = db.query(models.ShoppingList).filter(models.ShoppingList.id == list_id).first()
+    # Items are loaded up front so the delete-orphan cascade doesn't lazy-load
+    db_list = await db.scalar(_select_lists().where(
+        models.ShoppingList.id == list_id, models.ShoppingList.user_id == current_user.id
+    ))
     if not db_list:
         raise HTTPException(status_code=404, detail="Shopping list not found")
-    
-    db.delete(db_list)
-    db.commit()
+
+    await db.delete(db_list)
+    await record_deletions(
+        db, models.ShoppingItem.__tablename__, [(item.id, db_list.user_id) for item in db_list.items]
+    )
+    await db.commit()
+    await _list_changed(list_id, {"type": "list_deleted"})
     return {"message": "Shopping list deleted successfully"}
 
 # Shopping Items
 @router.post("/{list_id}/items", response_model=schemas.ShoppingItem)
-def add_item_to_list(list_id: int, item: schemas.ShoppingItemCreate, db: Session = Depends(get_db)):
+async def add_item_to_list(
+    list_id: int,
+    item: schemas.ShoppingItemCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Add an item to a shopping list"""
-    shopping_list = db.query(models.ShoppingList).filter(models.ShoppingList.id == list_id).first()
-    if not shopping_list:
-        raise HTTPException(status_code=404, detail="Shopping list not found")
-    
-    db_item = models.ShoppingItem(**item.model_dump(), shopping_list_id=list_id)
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await _ensure_list_owned(db, list_id, current_user.id)
+
+    db_item = await db.scalar(
+        insert(models.ShoppingItem)
+        .values(**item.model_dump(), shopping_list_id=list_id)
+        .returning(models.ShoppingItem)
+    )
+    await db.commit()
+    await _list_changed(list_id, {"type": "add", "items": [_item_delta(db_item)]})
     return db_item
 
+@router.post("/{list_id}/items/bulk", response_model=List[schemas.ShoppingItem])
+async def add_items_to_list(
+    list_id: int,
+    payload: schemas.ShoppingItemBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Add many items to a shopping list in one INSERT"""
+    await _ensure_list_owned(db, list_id, current_user.id)
+
+    items = await db.scalars(
+        insert(models.ShoppingItem).returning(models.ShoppingItem),
+        [{**item.model_dump(), "shopping_list_id": list_id} for item in payload.items]
+    )
+    items = items.all()
+    await db.commit()
+    await _list_changed(list_id, {"type": "add", "items": [_item_delta(item) for item in items]})
+    return items
+
+# Registered before /items/{item_id} so "purchase" isn't parsed as an id
+@router.put("/items/purchase", response_model=List[schemas.ShoppingItem])
+async def set_items_purchased(
+    payload: schemas.ShoppingItemPurchaseUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Set the purchase state of many items in one UPDATE; unknown ids and other users' items are skipped"""
+    items = await db.scalars(
+        update(models.ShoppingItem)
+        .where(
+            _item_id_in(db, payload.item_ids),
+            models.ShoppingItem.shopping_list_id.in_(_owned_list_ids(current_user.id)),
+        )
+        .values(is_purchased=payload.is_purchased)
+        .returning(models.ShoppingItem)
+    )
+    items = items.all()
+    await db.commit()
+    toggled = defaultdict(list)
+    for item in items:
+        toggled[item.shopping_list_id].append({"id": item.id, "is_purchased": item.is_purchased})
+    for list_id, changes in toggled.items():
+        await _list_changed(list_id, {"type": "toggle", "items": changes})
+    return items
+
 @router.put("/items/{item_id}", response_model=schemas.ShoppingItem)
-def update_shopping_item(item_id: int, is_purchased: bool, db: Session = Depends(get_db)):
+async def update_shopping_item(
+    item_id: int,
+    is_purchased: bool,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Update shopping item status"""
-    db_item = db.query(models.ShoppingItem).filter(models.ShoppingItem.id == item_id).first()
+    db_item = await db.scalar(
+        update(models.ShoppingItem)
+        .where(
+            models.ShoppingItem.id == item_id,
+            models.ShoppingItem.shopping_list_id.in_(_owned_list_ids(current_user.id)),
+        )
+        .values(is_purchased=is_purchased)
+        .returning(models.ShoppingItem)
+    )
     if not db_item:
         raise HTTPException(status_code=404, detail="Shopping item not found")
-    
-    db_item.is_purchased = is_purchased
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    await _list_changed(db_item.shopping_list_id, {
+        "type": "toggle", "items": [{"id": db_item.id, "is_purchased": db_item.is_purchased}]
+    })
     return db_item
 
 @router.delete("/items/{item_id}")
-def delete_shopping_item(item_id: int, db: Session = Depends(get_db)):
+async def delete_shopping_item(
+    item_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
     """Delete a shopping item"""
-    db_item = db.query(models.ShoppingItem).filter(models.ShoppingItem.id == item_id).first()
+    db_item = await db.scalar(select(models.ShoppingItem).where(
+        models.ShoppingItem.id == item_id,
+        models.ShoppingItem.shopping_list_id.in_(_owned_list_ids(current_user.id)),
+    ))
     if not db_item:
         raise HTTPException(status_code=404, detail="Shopping item not found")
-    
-    db.delete(db_item)
-    db.commit()
+
+    await db.delete(db_item)
+    await record_deletions(db, models.ShoppingItem.__tablename__, [(item_id, current_user.id)])
+    await db.commit()
+    await _list_changed(db_item.shopping_list_id, {"type": "delete", "ids": [item_id]})
     return {"message": "Shopping item deleted successfully"}
+
+
+# Live updates: a snapshot of the list, then item deltas as they happen
+async def _snapshot(list_id: int) -> Optional[dict]:
+    async with AsyncSessionLocal() as db:
+        shopping_list = await db.scalar(_select_lists().where(models.ShoppingList.id == list_id))
+        if not shopping_list:
+            return None
+        return {
+            "type": "snapshot",
+            "list_id": list_id,
+            "list": schemas.ShoppingList.model_validate(shopping_list).model_dump(mode="json"),
+        }
+
+@router.websocket("/{list_id}/ws")
+async def shopping_list_socket(websocket: WebSocket, list_id: int, token: str = Query(...)):
+    """Push changes to a shopping list over a WebSocket (token as a query parameter)"""
+    try:
+        async with AsyncSessionLocal() as db:
+            current_user = await resolve_token(token, db)
+            owner_id = await db.scalar(
+                select(models.ShoppingList.user_id).where(models.ShoppingList.id == list_id)
+            )
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if owner_id != current_user.id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    # Subscribe before the snapshot so no change falls in between
+    async with broker.subscribe(_channel(list_id)) as subscription:
+        snapshot = await _snapshot(list_id)
+        if snapshot is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Shopping list not found")
+            return
+        await websocket.send_json(snapshot)
+
+        async def forward():
+            async for message in subscription:
+                await websocket.send_json(message)
+                if message["type"] == "list_deleted":
+                    break
+
+        async def drain():
+            # Clients don't send anything; this notices them going away
+            while True:
+                await websocket.receive_text()
+
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.exception()  # WebSocketDisconnect is expected; don't log it as unretrieved
+    try:
+        await websocket.close()
+    except RuntimeError:
+        pass  # already closed by the client
+
+@router.get("/{list_id}/events")
+async def shopping_list_events(
+    list_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Push changes to a shopping list as server-sent events"""
+    await _ensure_list_owned(db, list_id, current_user.id)
+
+    async def events():
+        async with broker.subscribe(_channel(list_id)) as subscription:
+            snapshot = await _snapshot(list_id) or {"type": "list_deleted", "list_id": list_id}
+            yield b"data: " + dumps(snapshot) + b"\n\n"
+            if snapshot["type"] == "list_deleted":
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"data: " + dumps(message) + b"\n\n"
+                if message["type"] == "list_deleted":
+                    return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, List, Optional, Tuple
+from .. import models, schemas
+from ..auth import CurrentUser, get_current_user
+from ..database import get_async_db
+from ..serialization import dumps, rows_to_dicts, schema_columns
+from ..sync import settled_before
+from .recipes import recipe_dicts
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+DEFAULT_SYNC_LIMIT = 500
+MAX_SYNC_LIMIT = 5000
+
+def _sources(user_id: int) -> List[Tuple[str, object, type]]:
+    """(kind, statement, model) for everything a user syncs"""
+    return [
+        ("ingredients", select(*schema_columns(models.Ingredient, schemas.SyncIngredient))
+            .where(models.Ingredient.user_id == user_id), models.Ingredient),
+        ("recipes", select(*schema_columns(models.Recipe, schemas.SyncRecipe)), models.Recipe),
+        ("shopping_items", select(*schema_columns(models.ShoppingItem, schemas.SyncShoppingItem))
+            .join(models.ShoppingList, models.ShoppingList.id == models.ShoppingItem.shopping_list_id)
+            .where(models.ShoppingList.user_id == user_id), models.ShoppingItem),
+        ("deleted", select(
+            models.Tombstone.table_name, models.Tombstone.row_id,
+            models.Tombstone.row_version, models.Tombstone.deleted_at.label("updated_at")
+        ).where(or_(
+            models.Tombstone.user_id == user_id,
+            models.Tombstone.table_name == models.Recipe.__tablename__,
+        )), models.Tombstone),
+    ]
+
+async def _changes(db: AsyncSession, sources, condition: Callable, limit: Optional[int] = None) -> List[tuple]:
+    """(row_version, updated_at, kind, row) matching condition(model), lowest version first"""
+    changes = []
+    for kind, statement, model in sources:
+        statement = statement.where(condition(model)).order_by(model.row_version)
+        if limit is not None:
+            # Enough of each for the `limit` lowest overall, plus one to tell if there's more
+            statement = statement.limit(limit + 1)
+        changes.extend((row.row_version, row.updated_at, kind, row) for row in await db.execute(statement))
+    changes.sort(key=lambda change: change[0])
+    return changes
+
+@router.get("", response_model=schemas.SyncChanges)
+async def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_SYNC_LIMIT, ge=1, le=MAX_SYNC_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Ingredients, recipes and shopping items changed or deleted since a sync token (0 for everything)"""
+    cutoff = await settled_before(db)
+    sources = _sources(current_user.id)
+    changes = await _changes(db, sources, lambda model: model.row_version > since, limit)
+
+    truncated = len(changes) > limit
+    if truncated:
+        # Rows written by one statement can share a version (SQLite); never split them across pages
+        split_version = changes[limit][0]
+        changes = [change for change in changes[:limit] if change[0] < split_version]
+        if not changes:
+            changes = await _changes(db, sources, lambda model: model.row_version == split_version)
+
+    # Advance the token only through changes every reader can already see (app/sync.py)
+    token = since
+    for row_version, updated_at, _, _ in changes:
+        if updated_at is not None and updated_at >= cutoff:
+            break
+        token = row_version
+    # A page that can't advance the token would just come back again; wait for it to settle
+    has_more = truncated and token > since
+
+    batches = {"ingredients": [], "recipes": [], "shopping_items": [], "deleted": []}
+    for _, _, kind, row in changes:
+        batches[kind].append(row)
+    return Response(content=dumps({
+        "token": token,
+        "has_more": has_more,
+        "ingredients": rows_to_dicts(batches["ingredients"], schemas.SyncIngredient),
+        "recipes": await recipe_dicts(db, batches["recipes"], schemas.SyncRecipe),
+        "shopping_items": rows_to_dicts(batches["shopping_items"], schemas.SyncShoppingItem),
+        "deleted": [
+            {"table": row.table_name, "id": row.row_id, "row_version": row.row_version}
+            for row in batches["deleted"]
+        ],
+    }), media_type="application/json")
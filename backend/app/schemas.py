@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import date, datetime
 
@@ -30,6 +30,25 @@ class Ingredient(IngredientBase):
     class Config:
         from_attributes = True
 
+class IngredientBulkUpsert(BaseModel):
+    # Quantities are added to existing ingredients with the same name
+    items: List[IngredientCreate] = Field(..., min_length=1, max_length=1000)
+
+class IngredientBulkUpdateItem(IngredientUpdate):
+    id: int
+
+class IngredientBulkUpdate(BaseModel):
+    items: List[IngredientBulkUpdateItem] = Field(..., min_length=1, max_length=1000)
+
+class IngredientBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class IngredientBulkResult(BaseModel):
+    status: str  # created, updated, deleted or not_found
+    id: Optional[int] = None
+    name: Optional[str] = None
+    ingredient: Optional[Ingredient] = None
+
 # Shopping List Schemas
 class ShoppingItemBase(BaseModel):
     item_name: str
@@ -47,12 +66,27 @@ class ShoppingItem(ShoppingItemBase):
     class Config:
         from_attributes = True
 
+class ShoppingItemBulkCreate(BaseModel):
+    items: List[ShoppingItemCreate] = Field(..., min_length=1, max_length=1000)
+
+class ShoppingItemPurchaseUpdate(BaseModel):
+    item_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    is_purchased: bool
+
 class ShoppingListBase(BaseModel):
     name: str
 
 class ShoppingListCreate(ShoppingListBase):
     pass
 
+class RecipeSelection(BaseModel):
+    recipe_id: int
+    servings_multiplier: float = Field(1.0, gt=0)
+
+class ShoppingListFromRecipes(BaseModel):
+    name: Optional[str] = None
+    recipes: List[RecipeSelection] = Field(..., min_length=1, max_length=100)
+
 class ShoppingList(ShoppingListBase):
     id: int
     created_at: datetime
@@ -62,10 +96,25 @@ class ShoppingList(ShoppingListBase):
         from_attributes = True
 
 # Recipe Schemas
+class RecipeIngredientBase(BaseModel):
+    name: str
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+
+class RecipeIngredientCreate(RecipeIngredientBase):
+    pass
+
+class RecipeIngredient(RecipeIngredientBase):
+    # The recipe's own spelling; the model's `name` is the normalized lookup key
+    name: str = Field(validation_alias=AliasChoices("display_name", "name"))
+
+    class Config:
+        from_attributes = True
+
 class RecipeBase(BaseModel):
     name: str
     description: Optional[str] = None
-    ingredients: str  # JSON string
+    ingredients: str  # JSON string (legacy form, list of names)
     instructions: str
     prep_time: Optional[int] = None
     servings: int = 2
@@ -73,15 +122,67 @@ class RecipeBase(BaseModel):
     is_healthy: bool = True
 
 class RecipeCreate(RecipeBase):
-    pass
+    ingredients: str = "[]"
+    # Takes precedence over `ingredients` when given
+    ingredient_items: Optional[List[RecipeIngredientCreate]] = None
 
 class Recipe(RecipeBase):
     id: int
     created_at: datetime
+    ingredient_items: List[RecipeIngredient] = []
+
+    class Config:
+        from_attributes = True
+
+class ImportReport(BaseModel):
+    resource: str
+    read: int
+    inserted: int
+    updated: int
+    skipped: int
+    duplicates: int
+    invalid: int
+    ingredient_rows: int
+    seconds: float
+    rows_per_second: float
+    errors: List[str] = []
 
     class Config:
         from_attributes = True
 
+class RecipeMatch(BaseModel):
+    recipe: Recipe
+    coverage: float
+    matched_count: int
+    missing_count: int
+    expiring_count: int
+    missing_ingredients: List[str] = []
+
+# Sync Schemas (see app/sync.py)
+class SyncIngredient(Ingredient):
+    row_version: int
+
+class SyncShoppingItem(ShoppingItem):
+    updated_at: datetime
+    row_version: int
+
+class SyncRecipe(Recipe):
+    updated_at: datetime
+    row_version: int
+
+class SyncDeletion(BaseModel):
+    table: str  # ingredients, recipes or shopping_items
+    id: int
+    row_version: int
+
+class SyncChanges(BaseModel):
+    token: int  # pass back as ?since= on the next sync
+    has_more: bool
+    ingredients: List[SyncIngredient] = []
+    recipes: List[SyncRecipe] = []
+    shopping_items: List[SyncShoppingItem] = []
+    deleted: List[SyncDeletion] = []
+
 
 class UserBase(BaseModel):
     email: EmailStr
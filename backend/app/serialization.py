@@ -0,0 +1,56 @@
+"""
+Fast JSON rendering for list endpoints.
+
+List routes select plain column tuples and turn them into dicts in the
+response schema's field order, then encode them with orjson (or
+pydantic-core's encoder when orjson isn't installed). This skips ORM
+hydration and the per-object from_attributes validation pass while
+producing the same JSON; routes keep their response_model, so the
+OpenAPI schema is unchanged.
+"""
+from typing import Callable, Dict, List, Optional
+
+try:
+    import orjson
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data)
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    from pydantic_core import to_json as dumps
+
+
+def schema_columns(model, schema) -> List:
+    """Model columns for every response field that is a plain table column, in schema order"""
+    table_columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.model_fields if name in table_columns]
+
+
+def rows_to_dicts(rows, schema, computed: Optional[Dict[str, Callable]] = None) -> List[dict]:
+    """
+    Build response dicts from Row tuples. Fields that aren't columns of the
+    row come from `computed`, a field -> callable(row) mapping.
+    """
+    computed = computed or {}
+    fields = list(schema.model_fields)
+    if not rows:
+        return []
+    positions = {name: index for index, name in enumerate(rows[0]._fields)}
+    getters = [
+        (name, computed[name]) if name in computed else (name, positions[name])
+        for name in fields
+    ]
+    if not computed:
+        return [{name: row[index] for name, index in getters} for row in rows]
+    return [
+        {name: getter(row) if callable(getter) else row[getter] for name, getter in getters}
+        for row in rows
+    ]
+
+
+def group_rows(rows, key_index: int = 0) -> Dict:
+    """Group child Row tuples by one column, e.g. recipe_id"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[key_index], []).append(row)
+    return groups
+
@@ -0,0 +1,53 @@
+"""
+Incremental sync: what changed since a client's last token.
+
+Ingredients, recipes and shopping items carry a row_version taken from
+one shared counter (models.next_row_version) on every INSERT and UPDATE.
+Deletes leave a Tombstone stamped from the same counter. The token a
+client gets back is a row version; the next sync returns only rows and
+tombstones above it.
+
+Versions are handed out when a statement runs but only become visible
+when its transaction commits, so on PostgreSQL a slow writer (an import,
+say) can commit a version below one a client has already seen. The token
+therefore never moves past a change made after `settled_before()`; such
+changes are still returned, and come again on the next sync, which
+clients apply idempotently. Change stamps (models.utc_now) and that cutoff
+both come from the database clock, so skew between app hosts and the
+database can't make an unsettled change look settled.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import DateTime, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+# How long a change may take to become visible after its version is taken
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "2"))
+
+# least() ignores the NULL when no other transaction is writing
+_SETTLED_POSTGRESQL = text("""
+    SELECT least(timezone('utc', clock_timestamp()), min(xact_start) AT TIME ZONE 'UTC')
+    FROM pg_stat_activity
+    WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+""").columns(least=DateTime())
+
+
+async def record_deletions(db: AsyncSession, table_name: str, rows: Iterable[Tuple[int, Optional[int]]]):
+    """Write tombstones for deleted (id, owner id) rows"""
+    tombstones = [{"table_name": table_name, "row_id": row_id, "user_id": user_id} for row_id, user_id in rows]
+    if tombstones:
+        await db.execute(insert(models.Tombstone), tombstones)
+
+
+async def settled_before(db: AsyncSession) -> datetime:
+    """Changes stamped before this (UTC, by the database clock) are visible to every reader"""
+    if db.bind.dialect.name == "postgresql":
+        # A transaction still writing may hold versions from when it started
+        cutoff = await db.scalar(_SETTLED_POSTGRESQL)
+    else:
+        cutoff = await db.scalar(select(models.utc_now()))
+    return cutoff - timedelta(seconds=SYNC_SETTLE_SECONDS)
@@ -0,0 +1,106 @@
+"""
+Unit registry for ingredient and shopping quantities.
+
+Every known unit string (case and spacing insensitive, with common
+aliases) maps to a dimension and a factor to that dimension's base unit:
+grams for mass, millilitres for volume, pieces for counts. The table is
+built once at import, so converting a whole column of quantities is one
+dict lookup per distinct unit plus a multiply per value. Unknown units
+get a dimension of their own, so they still add up with themselves but
+never with anything else.
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+MASS = "mass"
+VOLUME = "volume"
+COUNT = "count"
+
+BASE_UNITS = {MASS: "g", VOLUME: "ml", COUNT: "pieces"}
+
+# canonical unit -> (dimension, factor to base, aliases)
+_DEFINITIONS = {
+    "mg": (MASS, 0.001, ["milligram", "milligrams"]),
+    "g": (MASS, 1.0, ["gram", "grams", "gr"]),
+    "kg": (MASS, 1000.0, ["kilogram", "kilograms", "kilo", "kilos"]),
+    "oz": (MASS, 28.349523125, ["ounce", "ounces"]),
+    "lb": (MASS, 453.59237, ["lbs", "pound", "pounds"]),
+    "ml": (VOLUME, 1.0, ["millilitre", "millilitres", "milliliter", "milliliters"]),
+    "cl": (VOLUME, 10.0, ["centilitre", "centilitres", "centiliter", "centiliters"]),
+    "dl": (VOLUME, 100.0, ["decilitre", "decilitres", "deciliter", "deciliters"]),
+    "l": (VOLUME, 1000.0, ["litre", "litres", "liter", "liters", "ltr"]),
+    "tsp": (VOLUME, 5.0, ["teaspoon", "teaspoons"]),
+    "tbsp": (VOLUME, 15.0, ["tablespoon", "tablespoons"]),
+    "cup": (VOLUME, 240.0, ["cups"]),
+    "pieces": (COUNT, 1.0, ["", "piece", "pcs", "pc", "each", "unit", "units", "x"]),
+    "dozen": (COUNT, 12.0, ["dozens"]),
+}
+
+
+class Unit(NamedTuple):
+    name: str  # canonical spelling
+    dimension: str
+    factor: float  # multiply by this to get the dimension's base unit
+
+
+def _key(unit: Optional[str]) -> str:
+    return " ".join((unit or "").split()).lower()
+
+
+_REGISTRY: Dict[str, Unit] = {}
+for _name, (_dimension, _factor, _aliases) in _DEFINITIONS.items():
+    for _alias in [_name, *_aliases]:
+        _REGISTRY[_key(_alias)] = Unit(_name, _dimension, _factor)
+
+
+def lookup(unit: Optional[str]) -> Unit:
+    """Resolve a unit string; unknown units become their own dimension"""
+    key = _key(unit)
+    found = _REGISTRY.get(key)
+    if found is None:
+        found = Unit(key, f"other:{key}", 1.0)
+    return found
+
+
+def normalize_unit(unit: Optional[str]) -> str:
+    """Canonical spelling of a unit string"""
+    return lookup(unit).name
+
+
+def base_unit(dimension: str) -> str:
+    """Base unit of a dimension (the unit itself for unknown dimensions)"""
+    return BASE_UNITS.get(dimension, dimension.split(":", 1)[-1])
+
+
+def compatible(unit_a: Optional[str], unit_b: Optional[str]) -> bool:
+    return lookup(unit_a).dimension == lookup(unit_b).dimension
+
+
+def convert(quantity: float, from_unit: Optional[str], to_unit: Optional[str]) -> float:
+    """Convert one quantity; raises ValueError across dimensions"""
+    source, target = lookup(from_unit), lookup(to_unit)
+    if source.dimension != target.dimension:
+        raise ValueError(f"Cannot convert {source.name!r} to {target.name!r}")
+    return quantity * (source.factor / target.factor)
+
+
+def to_base(
+    quantities: Sequence[Optional[float]], units: Sequence[Optional[str]]
+) -> Tuple[List[float], List[str]]:
+    """
+    Convert a column of quantities to base units in one pass.
+    Returns (base quantities, dimensions); missing quantities count as 0.
+    """
+    resolved = {unit: lookup(unit) for unit in set(units)}
+    columns = [resolved[unit] for unit in units]
+    return (
+        [(quantity or 0.0) * unit.factor for quantity, unit in zip(quantities, columns)],
+        [unit.dimension for unit in columns],
+    )
+
+
+def from_base(
+    quantities: Sequence[float], units: Sequence[Optional[str]]
+) -> List[float]:
+    """Express a column of base-unit quantities in the given units"""
+    factors = {unit: lookup(unit).factor for unit in set(units)}
+    return [quantity / factors[unit] for quantity, unit in zip(quantities, units)]
@@ -0,0 +1,16 @@
+"""
+Dialect-specific INSERT constructs for ON CONFLICT upserts.
+
+PostgreSQL and SQLite both support INSERT ... ON CONFLICT ... DO UPDATE
+with RETURNING, through their own `insert()` variants.
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def upsert_insert(dialect_name: str, entity):
+    """Return an insert() for `entity` that supports on_conflict_do_update()"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(entity)
+    if dialect_name == "sqlite":
+        return sqlite.insert(entity)
+    raise NotImplementedError(f"Upserts are not supported on {dialect_name}")
@@ -0,0 +1,90 @@
+"""
+Show the query plans for the expiring-soon and by-location ingredient
+queries before and after the per-owner indexes (PostgreSQL only)
+Run: python benchmarks/expiry_index_plan.py [--rows 1000000] [--users 1000]
+
+Works on a TEMP copy of the ingredients table, so the real data and
+indexes are never touched.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+
+EXPIRING_QUERY = """
+    SELECT * FROM bench_ingredients
+    WHERE user_id = :user_id AND expiry_date IS NOT NULL AND expiry_date <= CURRENT_DATE + 7
+    ORDER BY expiry_date
+"""
+LOCATION_QUERY = """
+    SELECT * FROM bench_ingredients
+    WHERE user_id = :user_id AND location = 'Fridge'
+    ORDER BY id LIMIT 200
+"""
+
+def explain(conn, query, user_id):
+    """Return (top plan node, execution ms) from EXPLAIN ANALYZE"""
+    plan = conn.execute(
+        text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), {"user_id": user_id}
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+    node = root["Plan"]
+    # Skip Sort/Limit wrappers to show how rows are fetched
+    while node["Node Type"] in ("Sort", "Limit", "Incremental Sort") and node.get("Plans"):
+        node = node["Plans"][0]
+    return node["Node Type"], node.get("Index Name"), root["Execution Time"]
+
+def report(conn, label, user_id):
+    print(f"\n{label}")
+    for name, query in (("expiring soon", EXPIRING_QUERY), ("by location", LOCATION_QUERY)):
+        node_type, index_name, ms = explain(conn, query, user_id)
+        suffix = f" using {index_name}" if index_name else ""
+        print(f"  {name:<14} {node_type}{suffix}: {ms:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("This benchmark needs PostgreSQL (DATABASE_URL)")
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TEMP TABLE bench_ingredients (LIKE ingredients INCLUDING DEFAULTS)"))
+        start = time.perf_counter()
+        # ~30% of rows never expire, the rest spread over the next 120 days
+        conn.execute(text("""
+            INSERT INTO bench_ingredients
+                (id, name, category, location, quantity, unit, expiry_date, created_at, updated_at, user_id)
+            SELECT g, 'item-' || g, 'Misc',
+                   CASE WHEN g % 2 = 0 THEN 'Fridge' ELSE 'Pantry' END,
+                   1, 'pieces',
+                   CASE WHEN g % 10 < 3 THEN NULL ELSE CURRENT_DATE + (g % 120)::int END,
+                   now(), now(), (g % CAST(:users AS int)) + 1
+            FROM generate_series(1, CAST(:rows AS int)) AS g
+        """), {"rows": args.rows, "users": args.users})
+        conn.execute(text("ANALYZE bench_ingredients"))
+        print(f"Loaded {args.rows:,} rows for {args.users:,} users in {time.perf_counter() - start:.1f}s")
+
+        report(conn, "Without per-owner indexes:", user_id=1)
+
+        conn.execute(text("""
+            CREATE INDEX bench_ix_user_expiry ON bench_ingredients (user_id, expiry_date)
+            WHERE expiry_date IS NOT NULL
+        """))
+        conn.execute(text("CREATE INDEX bench_ix_user_location ON bench_ingredients (user_id, location, id)"))
+        conn.execute(text("ANALYZE bench_ingredients"))
+
+        report(conn, "With ix_ingredients_user_expiry / ix_ingredients_user_location:", user_id=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Load test the API with concurrent clients and report latency percentiles per endpoint
+Run: python benchmarks/load_test.py [--url http://localhost:8778] [--concurrency 16] [--requests 300]
+     python benchmarks/load_test.py --output results.json --baseline baseline.json
+
+Seeds a synthetic dataset through the API (users, then each user's
+pantry, recipes and shopping lists via /import and the bulk endpoints),
+then runs each scenario with --concurrency async clients until it has
+made --requests requests. Results hold throughput and p50/p95/p99 per
+scenario. With --baseline, any scenario whose p95 grew, or whose
+throughput fell, by more than --max-regression makes the exit status 1.
+
+Without --url the app runs in-process through httpx's ASGI transport on a
+fresh SQLite database (or DATABASE_URL if set), so client and server share
+one event loop; compare in-process numbers only with each other. GET
+responses are served from the response cache after the first request,
+like a client that doesn't send If-None-Match.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "bench-password"
+CATEGORIES = ["Dairy", "Vegetables", "Fruits", "Meat", "Grains", "Spices"]
+UNITS = ["g", "kg", "ml", "l", "pcs"]
+WORDS = ["tomato", "basil", "garlic", "onion", "chicken", "rice", "lemon", "pepper", "cheese", "spinach",
+         "carrot", "potato", "ginger", "mushroom", "bean", "egg", "butter", "flour", "milk", "apple"]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: Callable[["Dataset", "Account"], str]
+    body: Optional[Callable[["Dataset", "Account"], dict]] = None
+
+
+class Account:
+    """A seeded user: auth headers plus the recipes, lists and items they own"""
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+        self.recipe_ids: List[int] = []
+        self.list_ids: List[int] = []
+        self.item_ids: List[int] = []
+
+
+class Dataset:
+    """The accounts seed() created"""
+
+    def __init__(self):
+        self.accounts: List[Account] = []
+
+    def user(self) -> Account:
+        return random.choice(self.accounts)
+
+    @property
+    def recipe_count(self) -> int:
+        return sum(len(account.recipe_ids) for account in self.accounts)
+
+    @property
+    def list_count(self) -> int:
+        return sum(len(account.list_ids) for account in self.accounts)
+
+
+# Each request runs as a random seeded user, on that user's own lists and items
+SCENARIOS = [
+    Scenario("health", "GET", lambda data, user: "/health"),
+    Scenario("ingredients.list", "GET", lambda data, user: "/ingredients/?limit=50"),
+    Scenario("ingredients.expiring", "GET", lambda data, user: "/ingredients/expiring/soon?days=7"),
+    Scenario("recipes.list", "GET", lambda data, user: "/recipes/?limit=50"),
+    Scenario("recipes.get", "GET", lambda data, user: f"/recipes/{random.choice(user.recipe_ids)}"),
+    Scenario("recipes.search", "GET", lambda data, user: f"/recipes/search?q={random.choice(WORDS)}"),
+    Scenario("recipes.match_ranked", "GET", lambda data, user: "/recipes/match/ranked?limit=10"),
+    Scenario("shopping_lists.list", "GET", lambda data, user: "/shopping-lists/?limit=20"),
+    Scenario("shopping_lists.get", "GET", lambda data, user: f"/shopping-lists/{random.choice(user.list_ids)}"),
+    Scenario(
+        "shopping_lists.purchase", "PUT", lambda data, user: "/shopping-lists/items/purchase",
+        lambda data, user: {"item_ids": random.sample(user.item_ids, min(5, len(user.item_ids))),
+                            "is_purchased": random.random() < 0.5},
+    ),
+    Scenario("sync.full", "GET", lambda data, user: "/sync?limit=500"),
+]
+
+
+# ------------------------------------------------------------
+# Seeding
+# ------------------------------------------------------------
+
+def _ndjson(records: List[dict]) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def _ingredients(count: int) -> List[dict]:
+    return [
+        {
+            "name": f"{random.choice(WORDS)} {i}",
+            "category": random.choice(CATEGORIES),
+            "location": random.choice(["Fridge", "Pantry"]),
+            "quantity": round(random.uniform(0.1, 10), 2),
+            "unit": random.choice(UNITS),
+            "expiry_date": str(date.today() + timedelta(days=random.randint(-5, 60))),
+        }
+        for i in range(count)
+    ]
+
+
+def _recipes(count: int, offset: int) -> List[dict]:
+    return [
+        {
+            "name": f"{random.choice(WORDS).title()} {random.choice(WORDS)} bake {offset + i}",
+            "description": " ".join(random.choices(WORDS, k=12)),
+            "instructions": "Chop, stir and simmer until done. " * 10,
+            "prep_time": random.randint(5, 90),
+            "servings": random.randint(1, 6),
+            "calories": random.randint(150, 900),
+            "is_healthy": random.random() < 0.5,
+            "ingredient_items": [
+                {"name": name, "quantity": random.randint(1, 500), "unit": random.choice(UNITS)}
+                for name in random.sample(WORDS, random.randint(3, 10))
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def _check(response: httpx.Response) -> httpx.Response:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: "
+                           f"{response.status_code} {response.text[:200]}")
+    return response
+
+
+async def seed(client: httpx.AsyncClient, args) -> Dataset:
+    """Create users and their data through the API"""
+    data = Dataset()
+    recipes_per_user = max(1, args.recipes // args.users)
+    for user in range(args.users):
+        email = f"bench{user}@example.com"
+        # An existing user from an earlier run against the same server is fine
+        await client.post("/auth/register", json={"email": email, "username": f"bench{user}", "password": PASSWORD})
+        token = _check(await client.post(
+            "/auth/login", data={"username": email, "password": PASSWORD}
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        account = Account(headers)
+        data.accounts.append(account)
+
+        for resource, records in (
+            ("ingredients", _ingredients(args.ingredients)),
+            ("recipes", _recipes(recipes_per_user, user * recipes_per_user)),
+        ):
+            _check(await client.post(
+                f"/import/{resource}", headers=headers,
+                files={"file": (f"{resource}.ndjson", _ndjson(records), "application/x-ndjson")},
+            ))
+
+        for number in range(args.lists):
+            list_id = _check(await client.post(
+                "/shopping-lists/", headers=headers, json={"name": f"Bench list {number}"}
+            )).json()["id"]
+            items = _check(await client.post(
+                f"/shopping-lists/{list_id}/items/bulk", headers=headers,
+                json={"items": [
+                    {"item_name": random.choice(WORDS), "quantity": random.randint(1, 5), "unit": random.choice(UNITS)}
+                    for _ in range(args.items)
+                ]},
+            )).json()
+            account.list_ids.append(list_id)
+            account.item_ids.extend(item["id"] for item in items)
+
+        # Recipes can only be read by their owner; the export lists just those
+        exported = _check(await client.get("/export/recipes", headers=headers)).text.splitlines()
+        account.recipe_ids.extend(json.loads(line)["id"] for line in exported)
+    return data
+
+
+# ------------------------------------------------------------
+# Running
+# ------------------------------------------------------------
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, data: Dataset, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            user = data.user()
+            body = scenario.body(data, user) if scenario.body else None
+            start = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path(data, user), headers=user.headers, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def regressions(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Scenarios that got slower or less reliable than the baseline"""
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if result["rps"] < base["rps"] * (1 - tolerance):
+            found.append(f"{name}: throughput {base['rps']} -> {result['rps']} req/s")
+        if result["errors"] > base.get("errors", 0):
+            found.append(f"{name}: errors {base.get('errors', 0)} -> {result['errors']}")
+    return found
+
+
+def in_process_client() -> httpx.AsyncClient:
+    """An ASGI client for the app on a migrated database"""
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="grocerymate-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # Seeding logs in every user once; the production cost factor isn't what's measured here
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    from app.database import engine
+    from app.main import app
+    from app.migrations import upgrade
+    upgrade(engine)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def run(args) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        client = in_process_client()
+
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name in args.only]
+    async with client:
+        start = time.perf_counter()
+        data = await seed(client, args)
+        print(f"Seeded {args.users} users, {data.recipe_count} recipes, {data.list_count} lists "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        print(f"{'scenario':<26}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+        for scenario in scenarios:
+            # A few untimed requests first, so caches and pools are warm
+            await run_scenario(client, scenario, data, args.concurrency, args.concurrency)
+            result = await run_scenario(client, scenario, data, args.requests, args.concurrency)
+            results[scenario.name] = result
+            print(f"{scenario.name:<26}{result['rps']:>9}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                  f"{result['p99_ms']:>9}{result['errors']:>8}")
+
+    if not args.url:
+        from app.passwords import password_hasher
+        password_hasher.shutdown()
+
+    return {
+        "meta": {
+            "at": datetime.utcnow().isoformat(),
+            "target": args.url or "in-process",
+            "python": platform.python_version(),
+            "users": args.users,
+            "ingredients_per_user": args.ingredients,
+            "recipes": args.recipes,
+            "lists_per_user": args.lists,
+            "items_per_list": args.items,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="benchmark a running server instead of the app in-process")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--ingredients", type=int, default=200, help="per user")
+    parser.add_argument("--recipes", type=int, default=1000, help="in total")
+    parser.add_argument("--lists", type=int, default=3, help="per user")
+    parser.add_argument("--items", type=int, default=25, help="per list")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=300, help="per scenario")
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="run only these scenarios")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --output to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95/throughput change (0.2 = 20%%)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the synthetic data")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        found = regressions(report["results"], baseline, args.max_regression)
+        for line in found:
+            print(f"❌ {line}")
+        if found:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare GET /recipes/ serialization paths on an in-memory SQLite copy
+Run: python benchmarks/serialization_throughput.py [--recipes 1000] [--rounds 20]
+
+"orm+pydantic" loads Recipe objects with selectinload and validates them
+through response_model (from_attributes). "columns+orjson" is what the list
+routes do now: column tuples, one ingredients query, dicts, orjson.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.pool import StaticPool
+
+from app import models, schemas
+from app.database import Base
+from app.serialization import dumps, group_rows, rows_to_dicts, schema_columns
+
+def seed(session, recipes):
+    user = models.User(email="bench@example.com", username="bench", hashed_password="x")
+    session.add(user)
+    session.flush()
+    for i in range(recipes):
+        recipe = models.Recipe(
+            name=f"Recipe {i}",
+            description="Benchmark recipe " * 5,
+            instructions="Chop, stir and simmer until done. " * 60,
+            prep_time=20,
+            servings=2,
+            calories=400,
+            is_healthy=bool(i % 2),
+            user_id=user.id,
+        )
+        recipe.set_ingredients([
+            {"name": f"ingredient {j}", "quantity": j + 0.5, "unit": "g"} for j in range(8)
+        ])
+        session.add(recipe)
+    session.commit()
+
+def orm_pydantic(session):
+    adapter = TypeAdapter(List[schemas.Recipe])
+    recipes = session.scalars(
+        select(models.Recipe).options(selectinload(models.Recipe.ingredient_items)).order_by(models.Recipe.id)
+    ).all()
+    return adapter.dump_json(adapter.validate_python(recipes, from_attributes=True))
+
+def columns_orjson(session):
+    rows = session.execute(
+        select(*schema_columns(models.Recipe, schemas.Recipe)).order_by(models.Recipe.id)
+    ).all()
+    items = group_rows(session.execute(
+        select(
+            models.RecipeIngredient.recipe_id,
+            models.RecipeIngredient.display_name,
+            models.RecipeIngredient.quantity,
+            models.RecipeIngredient.unit,
+        )
+        .where(models.RecipeIngredient.recipe_id.in_([row.id for row in rows]))
+        .order_by(models.RecipeIngredient.recipe_id, models.RecipeIngredient.position)
+    ).all())
+    return dumps(rows_to_dicts(rows, schemas.Recipe, {
+        "ingredients": lambda row: json.dumps([item.display_name for item in items.get(row.id, ())]),
+        "ingredient_items": lambda row: [
+            {"name": item.display_name, "quantity": item.quantity, "unit": item.unit}
+            for item in items.get(row.id, ())
+        ],
+    }))
+
+def timed(fn, session, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        session.expunge_all()
+        start = time.perf_counter()
+        body = fn(session)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.recipes)
+
+        results = {}
+        for name, fn in (("orm+pydantic", orm_pydantic), ("columns+orjson", columns_orjson)):
+            seconds, body = timed(fn, session, args.rounds)
+            results[name] = body
+            print(f"{name:>16}: {seconds * 1000:8.1f} ms/page  {args.recipes / seconds:10.0f} recipes/s  {len(body)} bytes")
+
+    same = json.loads(results["orm+pydantic"]) == json.loads(results["columns+orjson"])
+    print(f"Identical output: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,25 @@
 """
 Seed script to populate database with sample data
-Run: python seed_data.py
+Run: python seed_data.py [--email owner@example.com]
+
+Rows go through app.importer, so each list is one batched load.
+Without --email the sample data is given to the first registered user.
 """
 from datetime import date, timedelta
+import argparse
 import json
-from app.database import SessionLocal, engine
-from app.models import Base, Ingredient, Recipe
+import sys
+from sqlalchemy import select
+from app.database import engine
+from app.importer import import_records
+from app.migrations import upgrade
+from app.models import User
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create/upgrade tables
+upgrade(engine)
 
-def seed_ingredients():
+def seed_ingredients(user_id):
     """Add sample ingredients"""
-    db = SessionLocal()
-    
     sample_ingredients = [
         # Vegetables
         {
@@ -150,23 +156,11 @@ def seed_ingredients():
         }
     ]
     
-    added = 0
-    for ing_data in sample_ingredients:
-        # Check if already exists
-        existing = db.query(Ingredient).filter(Ingredient.name == ing_data["name"]).first()
-        if not existing:
-            ingredient = Ingredient(**ing_data)
-            db.add(ingredient)
-            added += 1
-    
-    db.commit()
-    db.close()
-    print(f"✅ Added {added} sample ingredients")
+    report = import_records(sample_ingredients, "ingredients", user_id)
+    print(f"✅ Added {report.inserted} sample ingredients ({report.updated} refreshed)")
 
-def seed_recipes():
+def seed_recipes(user_id):
     """Add sample healthy recipes"""
-    db = SessionLocal()
-    
     sample_recipes = [
         {
             "name": "Grilled Chicken Salad",
@@ -220,24 +214,29 @@ def seed_recipes():
         }
     ]
     
-    added = 0
-    for recipe_data in sample_recipes:
-        # Check if already exists
-        existing = db.query(Recipe).filter(Recipe.name == recipe_data["name"]).first()
-        if not existing:
-            recipe = Recipe(**recipe_data)
-            db.add(recipe)
-            added += 1
-    
-    db.commit()
-    db.close()
-    print(f"✅ Added {added} sample recipes")
+    report = import_records(sample_recipes, "recipes", user_id)
+    print(f"✅ Added {report.inserted} sample recipes")
+
+def find_owner(email=None):
+    """Id of the user to own the sample data"""
+    statement = select(User.id)
+    statement = statement.where(User.email == email) if email else statement.order_by(User.id).limit(1)
+    with engine.connect() as conn:
+        return conn.scalar(statement)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the database with sample data")
+    parser.add_argument("--email", help="owner of the sample data (default: first user)")
+    args = parser.parse_args()
+
+    user_id = find_owner(args.email)
+    if user_id is None:
+        sys.exit("❌ No matching user - register one through /auth/register first")
+
     print("🌱 Seeding database with sample data...")
     print()
-    seed_ingredients()
-    seed_recipes()
+    seed_ingredients(user_id)
+    seed_recipes(user_id)
     print()
     print("✅ Database seeding complete!")
     print("You can now start the application and see sample data.")
@@ -4,8 +4,7 @@ Simple Database Initialization - Using psycopg2 directly to avoid encoding issue
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from sqlalchemy import create_engine
-from app.database import Base
-from app.models import Ingredient, ShoppingList, ShoppingItem, Recipe
+from app.migrations import upgrade
 import logging
 from urllib.parse import urlparse
 import os
@@ -75,7 +74,7 @@ def ensure_database_exists():
         return False
 
 def create_tables():
-    """Create all tables using SQLAlchemy"""
+    """Create/upgrade all tables via app.migrations"""
     try:
         logger.info("Creating/verifying tables...")
         
@@ -86,8 +85,8 @@ def create_tables():
             connect_args={'client_encoding': 'utf8'}
         )
         
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables and record the schema version
+        upgrade(engine)
         
         # Verify tables were created
         from sqlalchemy import inspect
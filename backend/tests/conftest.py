@@ -0,0 +1,72 @@
+"""
+Shared fixtures: every test gets a freshly migrated SQLite database and
+empty in-process caches. Users are inserted directly and given a token,
+so tests don't wait on bcrypt workers.
+"""
+import os
+import tempfile
+
+_database_dir = tempfile.mkdtemp(prefix="grocerymate-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app import models
+from app.auth import create_access_token, principal_cache
+from app.cache import response_cache
+from app.database import Base, engine
+from app.main import app
+from app.migrations import upgrade
+from app.recipe_index import recipe_index
+from app.recipe_search import recipe_search_index
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """A migrated, empty database and no state cached from earlier tests"""
+    Base.metadata.drop_all(engine)
+    upgrade(engine)
+    recipe_index.invalidate()
+    recipe_search_index.invalidate()
+    response_cache.clear()
+    principal_cache.clear()
+    yield engine
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def create_user(email: str) -> int:
+    """Insert a user and return its id"""
+    with engine.begin() as conn:
+        return conn.scalar(
+            insert(models.User)
+            .values(email=email, username=email.split("@")[0], hashed_password="x")
+            .returning(models.User.id)
+        )
+
+
+def auth_headers(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+@pytest.fixture
+def user():
+    """(id, headers) of a fresh user"""
+    return create_user("alice@example.com"), auth_headers("alice@example.com")
+
+
+@pytest.fixture
+def other_user():
+    return create_user("bob@example.com"), auth_headers("bob@example.com")
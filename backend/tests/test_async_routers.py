@@ -0,0 +1,73 @@
+"""The data routers on aiosqlite, driven through the ASGI app on the test's own event loop"""
+import httpx
+import pytest
+
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+RECIPE = {
+    "name": "Tomato salad",
+    "instructions": "Slice and season.",
+    "ingredient_items": [{"name": "Tomato", "quantity": 2, "unit": "pieces"}, {"name": "Basil"}],
+}
+
+
+@pytest.fixture
+async def api():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+        yield async_client
+
+
+async def test_ingredient_crud(api, user):
+    _, headers = user
+    created = (await api.post("/ingredients/", json=TOMATO, headers=headers)).json()
+    assert created["name"] == "Tomato"
+
+    response = await api.put(f"/ingredients/{created['id']}", json={"quantity": 6}, headers=headers)
+    assert response.json()["quantity"] == 6
+    assert [row["id"] for row in (await api.get("/ingredients/", headers=headers)).json()] == [created["id"]]
+
+    assert (await api.delete(f"/ingredients/{created['id']}", headers=headers)).status_code == 200
+    assert (await api.get(f"/ingredients/{created['id']}", headers=headers)).status_code == 404
+
+
+async def test_ingredients_are_private(api, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    created = (await api.post("/ingredients/", json=TOMATO, headers=headers)).json()
+    assert (await api.get(f"/ingredients/{created['id']}", headers=other_headers)).status_code == 404
+    assert (await api.get("/ingredients/", headers=other_headers)).json() == []
+
+
+async def test_recipe_create_get_and_list(api, user):
+    _, headers = user
+    created = (await api.post("/recipes/", json=RECIPE, headers=headers)).json()
+    assert [item["name"] for item in created["ingredient_items"]] == ["Tomato", "Basil"]
+
+    fetched = (await api.get(f"/recipes/{created['id']}", headers=headers)).json()
+    assert fetched["ingredient_items"] == created["ingredient_items"]
+    assert [recipe["id"] for recipe in (await api.get("/recipes/")).json()] == [created["id"]]
+
+
+async def test_shopping_list_items(api, user):
+    _, headers = user
+    shopping_list = (await api.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers)).json()
+    list_id = shopping_list["id"]
+
+    items = (await api.post(f"/shopping-lists/{list_id}/items/bulk", headers=headers, json={"items": [
+        {"item_name": "milk", "quantity": 1, "unit": "L"},
+        {"item_name": "eggs", "quantity": 6, "unit": "pieces"},
+    ]})).json()
+    toggled = (await api.put("/shopping-lists/items/purchase", headers=headers, json={
+        "item_ids": [item["id"] for item in items], "is_purchased": True,
+    })).json()
+    assert all(item["is_purchased"] for item in toggled)
+
+    await api.delete(f"/shopping-lists/items/{items[0]['id']}", headers=headers)
+    fetched = (await api.get(f"/shopping-lists/{list_id}", headers=headers)).json()
+    assert [item["item_name"] for item in fetched["items"]] == ["eggs"]
+
+    assert (await api.delete(f"/shopping-lists/{list_id}", headers=headers)).status_code == 200
+    assert (await api.get(f"/shopping-lists/{list_id}", headers=headers)).status_code == 404
@@ -0,0 +1,77 @@
+from sqlalchemy import delete, update
+
+from app import models
+from app.database import SessionLocal, engine
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+
+
+def test_etag_follows_writes_from_other_processes(client, user):
+    _, headers = user
+    created = client.post("/ingredients/", json=TOMATO, headers=headers).json()
+    first = client.get("/ingredients/", headers=headers)
+    etag = first.headers["ETag"]
+    assert client.get("/ingredients/", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    # As another worker or the importer would, bypassing this process entirely
+    with engine.begin() as conn:
+        conn.execute(
+            update(models.Ingredient).where(models.Ingredient.id == created["id"])
+            .values(quantity=9, row_version=models.next_row_version())
+        )
+    fresh = client.get("/ingredients/", headers={**headers, "If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()[0]["quantity"] == 9
+    assert fresh.headers["ETag"] != etag
+
+
+def test_etag_changes_on_delete(client, user):
+    _, headers = user
+    list_id = client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+    item = client.post(f"/shopping-lists/{list_id}/items", headers=headers,
+                       json={"item_name": "milk", "quantity": 1, "unit": "L"}).json()
+    etag = client.get(f"/shopping-lists/{list_id}", headers=headers).headers["ETag"]
+
+    client.delete(f"/shopping-lists/items/{item['id']}", headers=headers)
+    response = client.get(f"/shopping-lists/{list_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+
+def test_cached_list_is_only_served_to_its_owner(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    list_id = client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+    response = client.get(f"/shopping-lists/{list_id}", headers=headers)
+    assert response.status_code == 200
+
+    assert client.get(f"/shopping-lists/{list_id}").status_code == 401
+    assert client.get(f"/shopping-lists/{list_id}", headers=other_headers).status_code == 404
+    assert client.get(
+        f"/shopping-lists/{list_id}", headers={**other_headers, "If-None-Match": response.headers["ETag"]}
+    ).status_code == 404
+
+
+def test_recipe_listing_etag_follows_inserts_and_deletes(client, user):
+    user_id, headers = user
+    with SessionLocal() as db:
+        recipe = models.Recipe(name="Tomato soup", instructions="Cook.", user_id=user_id)
+        db.add(recipe)
+        db.commit()
+        recipe_id = recipe.id
+    etag = client.get("/recipes/").headers["ETag"]
+    assert client.get("/recipes/", headers={"If-None-Match": etag}).status_code == 304
+
+    with SessionLocal() as db:
+        db.add(models.Recipe(name="Tomato salad", instructions="Chop.", user_id=user_id))
+        db.commit()
+    response = client.get("/recipes/", headers={"If-None-Match": etag})
+    assert [recipe["name"] for recipe in response.json()] == ["Tomato soup", "Tomato salad"]
+    etag = response.headers["ETag"]
+
+    with SessionLocal() as db:
+        db.execute(delete(models.Recipe).where(models.Recipe.id == recipe_id))
+        db.add(models.Tombstone(table_name="recipes", row_id=recipe_id, user_id=user_id))
+        db.commit()
+    response = client.get("/recipes/", headers={"If-None-Match": etag})
+    assert [recipe["name"] for recipe in response.json()] == ["Tomato salad"]
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+
+from app import auth
+from app.routers import export
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+
+
+def _recipe(client, headers, name, ingredients):
+    return client.post("/recipes/", headers=headers, json={
+        "name": name, "instructions": "Cook.", "ingredients": json.dumps(ingredients),
+    }).json()["id"]
+
+
+def _ndjson(response):
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_recipe_export_nests_ingredients_across_batches(client, user, other_user, monkeypatch):
+    # One row per round trip, so every recipe's ingredients straddle a batch boundary
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 1)
+    user_id, headers = user
+    _, other_headers = other_user
+    soup = _recipe(client, headers, "Tomato soup", ["Tomato", "Basil"])
+    toast = _recipe(client, headers, "Toast", [])
+    salad = _recipe(client, headers, "Salad", ["Lettuce"])
+    _recipe(client, other_headers, "Theirs", ["Rice"])
+
+    records = _ndjson(client.get("/export/recipes", headers=headers))
+    assert [(record["id"], record["name"], record["user_id"]) for record in records] == [
+        (soup, "Tomato soup", user_id), (toast, "Toast", user_id), (salad, "Salad", user_id),
+    ]
+    assert [item["name"] for item in records[0]["ingredient_items"]] == ["Tomato", "Basil"]
+    assert records[1]["ingredient_items"] == []
+    assert [item["name"] for item in records[2]["ingredient_items"]] == ["Lettuce"]
+
+
+def test_csv_export_writes_nested_rows_as_json(client, user):
+    _, headers = user
+    list_id = client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+    client.post(f"/shopping-lists/{list_id}/items", headers=headers,
+                json={"item_name": "milk", "quantity": 1, "unit": "L"})
+
+    response = client.get("/export/shopping-lists", params={"format": "csv"}, headers=headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["name"]) for row in rows] == [(str(list_id), "Weekly")]
+    assert [item["item_name"] for item in json.loads(rows[0]["items"])] == ["milk"]
+
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    response = client.get("/export/ingredients", params={"format": "csv"}, headers=headers)
+    header, row = list(csv.reader(io.StringIO(response.text)))
+    assert header[0] == "id" and header[-1] == "user_id"
+    assert dict(zip(header, row))["name"] == "Tomato"
+
+
+def test_exporting_every_users_rows_takes_an_admin(client, user, other_user, monkeypatch):
+    _, headers = user
+    _, other_headers = other_user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    client.post("/ingredients/", json=TOMATO, headers=other_headers)
+
+    assert client.get("/export/ingredients").status_code == 401
+    assert client.get("/export/pantry", headers=headers).status_code == 404
+    assert client.get("/export/ingredients", params={"all_users": True}, headers=headers).status_code == 403
+
+    monkeypatch.setattr(auth, "ADMIN_EMAILS", {"alice@example.com"})
+    records = _ndjson(client.get("/export/ingredients", params={"all_users": True}, headers=headers))
+    assert len(records) == 2
@@ -0,0 +1,125 @@
+"""
+The importer's executemany fallback runs on every test database. The
+PostgreSQL COPY + merge path needs a server: set TEST_POSTGRES_URL to a
+scratch database (its tables are dropped afterwards) to run those tests.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app import importer, models
+from app.database import Base
+from app.migrations import upgrade
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+FLOUR = {"name": "Flour", "category": "Baking", "location": "Pantry", "quantity": 1, "unit": "kg"}
+SOUP = {"name": "Tomato soup", "instructions": "Simmer.", "ingredient_items": [{"name": "Tomato", "quantity": 3}]}
+
+
+def _pantry(bind, user_id) -> dict:
+    with bind.connect() as conn:
+        rows = conn.execute(
+            select(models.Ingredient.name, models.Ingredient.quantity, models.Ingredient.unit)
+            .where(models.Ingredient.user_id == user_id)
+        ).all()
+    return {name: (quantity, unit) for name, quantity, unit in rows}
+
+
+def test_invalid_records_are_reported_by_number_across_chunks(database, user):
+    user_id, _ = user
+    records = [
+        TOMATO,
+        {"name": "Salt", "location": "Pantry", "quantity": 1, "unit": "g"},
+        FLOUR,
+        {**FLOUR, "quantity": 500, "unit": "g"},
+        {**TOMATO, "quantity": "lots"},
+    ]
+    report = importer.import_records(iter(records), "ingredients", user_id, bind=database, chunk_size=2)
+
+    assert (report.read, report.inserted, report.duplicates, report.invalid) == (5, 2, 1, 2)
+    assert [error.split(":", 1)[0] for error in report.errors] == ["record 2", "record 5"]
+    assert "category" in report.errors[0] and "quantity" in report.errors[1]
+    assert _pantry(database, user_id) == {"Tomato": (4, "pieces"), "Flour": (1.5, "kg")}
+
+
+def test_error_list_is_capped_but_every_invalid_record_counted(database, user, monkeypatch):
+    monkeypatch.setattr(importer, "MAX_REPORTED_ERRORS", 2)
+    user_id, _ = user
+    records = [{"name": f"Broken {number}"} for number in range(5)] + [TOMATO]
+    report = importer.import_records(iter(records), "ingredients", user_id, bind=database, chunk_size=4)
+
+    assert (report.invalid, report.inserted) == (5, 1)
+    assert [error.split(":", 1)[0] for error in report.errors] == ["record 1", "record 2"]
+
+
+def test_recipes_keep_the_first_of_each_name_and_skip_existing_ones(database, user):
+    user_id, _ = user
+    importer.import_records(iter([SOUP]), "recipes", user_id, bind=database)
+    report = importer.import_records(
+        iter([SOUP, {**SOUP, "name": "Salad"}, {**SOUP, "name": "Salad", "instructions": "Toss."}]),
+        "recipes", user_id, bind=database, chunk_size=2,
+    )
+    assert (report.inserted, report.skipped, report.duplicates, report.ingredient_rows) == (1, 1, 1, 1)
+
+    with database.connect() as conn:
+        rows = conn.execute(
+            select(models.Recipe.name, models.Recipe.instructions, models.RecipeIngredient.display_name)
+            .join(models.RecipeIngredient)
+            .order_by(models.Recipe.id)
+        ).all()
+    assert [tuple(row) for row in rows] == [("Tomato soup", "Simmer.", "Tomato"), ("Salad", "Simmer.", "Tomato")]
+
+
+@pytest.fixture
+def postgres():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    bind = create_engine(TEST_POSTGRES_URL.replace("postgresql://", "postgresql+psycopg://", 1))
+    Base.metadata.drop_all(bind)
+    upgrade(bind)
+    with bind.begin() as conn:
+        user_id = conn.scalar(
+            models.User.__table__.insert()
+            .values(email="alice@example.com", username="alice", hashed_password="x")
+            .returning(models.User.id)
+        )
+    yield bind, user_id
+    Base.metadata.drop_all(bind)
+    bind.dispose()
+
+
+def test_copy_merge_upserts_ingredients(postgres):
+    bind, user_id = postgres
+    importer.import_records(iter([TOMATO, FLOUR]), "ingredients", user_id, bind=bind)
+    records = [
+        {**TOMATO, "quantity": 2},
+        {**FLOUR, "quantity": 250, "unit": "g"},
+        {**FLOUR, "quantity": 250, "unit": "g"},
+        {"name": "Rice", "category": "Grains", "location": "Pantry", "quantity": 1, "unit": "kg"},
+    ]
+    report = importer.import_records(iter(records), "ingredients", user_id, bind=bind)
+    assert (report.inserted, report.updated, report.duplicates, report.invalid) == (1, 2, 1, 0)
+    assert _pantry(bind, user_id) == {"Tomato": (6, "pieces"), "Flour": (1.5, "kg"), "Rice": (1, "kg")}
+
+
+def test_copy_merge_inserts_new_recipes_with_their_ingredients(postgres):
+    bind, user_id = postgres
+    importer.import_records(iter([SOUP]), "recipes", user_id, bind=bind)
+    report = importer.import_records(
+        iter([SOUP, {**SOUP, "name": "Salad", "ingredient_items": [{"name": "Lettuce"}, {"name": "Tomato"}]}]),
+        "recipes", user_id, bind=bind,
+    )
+    assert (report.inserted, report.skipped, report.ingredient_rows) == (1, 1, 2)
+
+    with bind.connect() as conn:
+        rows = conn.execute(
+            select(models.Recipe.name, models.RecipeIngredient.name, models.RecipeIngredient.display_name)
+            .join(models.RecipeIngredient)
+            .order_by(models.Recipe.id, models.RecipeIngredient.position)
+        ).all()
+    assert [tuple(row) for row in rows] == [
+        ("Tomato soup", "tomato", "Tomato"), ("Salad", "lettuce", "Lettuce"), ("Salad", "tomato", "Tomato"),
+    ]
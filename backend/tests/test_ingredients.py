@@ -0,0 +1,77 @@
+import json
+
+TOMATO = {
+    "name": "Tomato", "category": "Vegetables", "location": "Fridge",
+    "quantity": 4, "unit": "pieces", "expiry_date": "2030-01-31",
+}
+FLOUR = {"name": "Flour", "category": "Baking", "location": "Pantry", "quantity": 1, "unit": "kg"}
+
+
+def _pantry(client, headers) -> dict:
+    return {row["name"]: row for row in client.get("/ingredients/", headers=headers).json()}
+
+
+def _import(client, headers, records):
+    body = "".join(json.dumps(record) + "\n" for record in records)
+    response = client.post("/import/ingredients", headers=headers, files={"file": ("pantry.ndjson", body)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bulk_upsert_adds_quantities_and_keeps_omitted_fields(client, user):
+    _, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    response = client.post("/ingredients/bulk", headers=headers, json={"items": [
+        {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 2, "unit": "pieces"},
+    ]})
+    assert response.json()[0]["status"] == "updated"
+
+    tomato = _pantry(client, headers)["Tomato"]
+    assert tomato["quantity"] == 6
+    assert tomato["expiry_date"] == "2030-01-31"
+
+
+def test_import_merges_like_bulk_upsert(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    for target in (headers, other_headers):
+        client.post("/ingredients/", json=TOMATO, headers=target)
+        client.post("/ingredients/", json=FLOUR, headers=target)
+
+    changes = [
+        {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 2, "unit": "pieces"},
+        {"name": "Flour", "category": "Baking", "location": "Pantry", "quantity": 250, "unit": "g"},
+        {"name": "Flour", "category": "Baking", "location": "Pantry", "quantity": 250, "unit": "g"},
+    ]
+    client.post("/ingredients/bulk", headers=headers, json={"items": changes})
+    report = _import(client, other_headers, changes)
+    assert (report["updated"], report["duplicates"], report["invalid"]) == (2, 1, 0)
+
+    for pantry in (_pantry(client, headers), _pantry(client, other_headers)):
+        assert pantry["Tomato"]["quantity"] == 6
+        assert pantry["Tomato"]["expiry_date"] == "2030-01-31"
+        assert (pantry["Flour"]["quantity"], pantry["Flour"]["unit"]) == (1.5, "kg")
+
+
+def test_import_rejects_incompatible_units(client, user):
+    _, headers = user
+    client.post("/ingredients/", json=FLOUR, headers=headers)
+    report = _import(client, headers, [{**FLOUR, "quantity": 2, "unit": "pieces"}])
+    assert (report["updated"], report["invalid"]) == (0, 1)
+    assert _pantry(client, headers)["Flour"]["quantity"] == 1
+
+
+def test_bulk_upsert_clears_an_expiry_date_set_to_null(client, user):
+    _, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    client.post("/ingredients/", json={**FLOUR, "expiry_date": "2030-06-30"}, headers=headers)
+    response = client.post("/ingredients/bulk", headers=headers, json={"items": [
+        {**TOMATO, "quantity": 1, "expiry_date": None},
+        {**FLOUR, "quantity": 1, "location": "Cupboard"},
+    ]})
+    assert [result["status"] for result in response.json()] == ["updated", "updated"]
+
+    pantry = _pantry(client, headers)
+    assert (pantry["Tomato"]["quantity"], pantry["Tomato"]["expiry_date"]) == (5, None)
+    assert (pantry["Flour"]["quantity"], pantry["Flour"]["expiry_date"]) == (2, "2030-06-30")
+    assert pantry["Flour"]["location"] == "Cupboard"
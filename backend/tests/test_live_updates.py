@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.main import app
+from app.pubsub import RESYNC, InMemoryBroker, broker
+
+
+def _token(headers: dict) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+
+def _new_list(client, headers) -> int:
+    return client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+
+
+@pytest.mark.anyio
+async def test_slow_subscriber_gets_a_single_resync():
+    slow_broker = InMemoryBroker(queue_size=2)
+    async with slow_broker.subscribe("shopping-list:1") as slow, slow_broker.subscribe("shopping-list:1") as fast:
+        for n in range(5):
+            await slow_broker.publish("shopping-list:1", {"type": "add", "n": n})
+            assert await fast.get() == {"type": "add", "n": n}
+        assert await slow.get() == RESYNC
+
+        await slow_broker.publish("shopping-list:1", {"type": "add", "n": 5})
+        assert await slow.get() == {"type": "add", "n": 5}
+    assert slow_broker.subscriber_count() == 0
+
+
+def test_websocket_sends_snapshot_then_changes(client, user):
+    _, headers = user
+    list_id = _new_list(client, headers)
+    with client.websocket_connect(f"/shopping-lists/{list_id}/ws?token={_token(headers)}") as websocket:
+        snapshot = websocket.receive_json()
+        assert (snapshot["type"], snapshot["list"]["id"], snapshot["list"]["items"]) == ("snapshot", list_id, [])
+
+        item = client.post(f"/shopping-lists/{list_id}/items", headers=headers,
+                           json={"item_name": "milk", "quantity": 1, "unit": "L"}).json()
+        added = websocket.receive_json()
+        assert (added["type"], [change["id"] for change in added["items"]]) == ("add", [item["id"]])
+
+        client.put(f"/shopping-lists/items/{item['id']}", params={"is_purchased": True}, headers=headers)
+        assert websocket.receive_json()["items"] == [{"id": item["id"], "is_purchased": True}]
+
+        client.delete(f"/shopping-lists/{list_id}", headers=headers)
+        assert websocket.receive_json()["type"] == "list_deleted"
+
+
+@pytest.mark.parametrize("token", ["other", "invalid"])
+def test_websocket_rejects_other_users_and_bad_tokens(client, user, other_user, token):
+    _, headers = user
+    _, other_headers = other_user
+    list_id = _new_list(client, headers)
+    token = _token(other_headers) if token == "other" else "not-a-token"
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/shopping-lists/{list_id}/ws?token={token}") as websocket:
+            websocket.receive_json()
+    assert closed.value.code == 1008
+
+
+def test_event_stream_is_only_for_the_owner(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    list_id = _new_list(client, headers)
+    assert client.get(f"/shopping-lists/{list_id}/events").status_code == 401
+    assert client.get(f"/shopping-lists/{list_id}/events", headers=other_headers).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_event_stream_sends_snapshot_then_changes(client, user):
+    _, headers = user
+    list_id = _new_list(client, headers)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+        async def change_then_delete():
+            while not broker.subscriber_count():
+                await asyncio.sleep(0.01)
+            await api.post(f"/shopping-lists/{list_id}/items", headers=headers,
+                           json={"item_name": "milk", "quantity": 1, "unit": "L"})
+            await api.delete(f"/shopping-lists/{list_id}", headers=headers)
+
+        response, _ = await asyncio.wait_for(asyncio.gather(
+            api.get(f"/shopping-lists/{list_id}/events", headers=headers), change_then_delete()
+        ), timeout=10)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(event[len("data: "):]) for event in response.text.split("\n\n") if event.startswith("data: ")]
+    assert [event["type"] for event in events] == ["snapshot", "add", "list_deleted"]
@@ -0,0 +1,42 @@
+"""
+The load test's in-process scenarios at a tiny scale: every scenario must
+run without errors as a seeded user, on that user's own recipes and
+lists only.
+"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import load_test
+from app.passwords import password_hasher
+
+TINY = SimpleNamespace(users=2, ingredients=5, recipes=6, lists=2, items=3, concurrency=2, requests=4)
+
+
+@pytest.mark.anyio
+async def test_scenarios_run_without_errors():
+    random.seed(0)
+    try:
+        async with load_test.in_process_client() as client:
+            data = await load_test.seed(client, TINY)
+            assert data.recipe_count == TINY.recipes
+            for scenario in load_test.SCENARIOS:
+                result = await load_test.run_scenario(client, scenario, data, TINY.requests, TINY.concurrency)
+                assert result["errors"] == 0, scenario.name
+
+            owner, stranger = data.accounts
+            listed = (await client.get("/shopping-lists/", headers=owner.headers)).json()
+            assert sorted(shopping_list["id"] for shopping_list in listed) == sorted(owner.list_ids)
+            response = await client.get(f"/shopping-lists/{stranger.list_ids[0]}", headers=owner.headers)
+            assert response.status_code == 404
+            response = await client.get(f"/recipes/{stranger.recipe_ids[0]}", headers=owner.headers)
+            assert response.status_code == 404
+            response = await client.put(
+                "/shopping-lists/items/purchase", headers=owner.headers,
+                json={"item_ids": stranger.item_ids, "is_purchased": True},
+            )
+            assert response.json() == []
+            assert (await client.get("/shopping-lists/")).status_code == 401
+    finally:
+        password_hasher.shutdown()
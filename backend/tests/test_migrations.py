@@ -0,0 +1,61 @@
+from sqlalchemy import select, text
+
+from app import models
+from app.migrations import upgrade
+
+
+def test_unparseable_legacy_ingredients_are_kept(database):
+    with database.begin() as conn:
+        conn.execute(text("ALTER TABLE recipes ADD COLUMN ingredients TEXT"))
+        conn.execute(text("DELETE FROM schema_version"))
+        user_id = conn.execute(text(
+            "INSERT INTO users (email, username, hashed_password) VALUES ('a@example.com', 'a', 'x') RETURNING id"
+        )).scalar()
+        for name, ingredients in (("Parsed", '["Tomato", "Basil"]'), ("Broken", "2 eggs, flour")):
+            conn.execute(text(
+                "INSERT INTO recipes (name, instructions, servings, user_id, ingredients, row_version) "
+                "VALUES (:name, 'Cook.', 2, :user_id, :ingredients, 1)"
+            ), {"name": name, "user_id": user_id, "ingredients": ingredients})
+
+    upgrade(database)
+
+    with database.connect() as conn:
+        rows = conn.execute(
+            select(models.Recipe.name, models.RecipeIngredient.name)
+            .join(models.RecipeIngredient)
+            .order_by(models.Recipe.name, models.RecipeIngredient.position)
+        ).all()
+    assert [tuple(row) for row in rows] == [
+        ("Broken", "2 eggs, flour"), ("Parsed", "tomato"), ("Parsed", "basil"),
+    ]
+
+
+def test_next_row_version_seeks_an_index_per_table(database):
+    maxima = " UNION ALL ".join(
+        f"SELECT max(row_version) AS v FROM {table}" for table in models.VERSIONED_TABLES
+    )
+    with database.connect() as conn:
+        plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN SELECT max(v) FROM ({maxima})"))]
+    for table in models.VERSIONED_TABLES:
+        assert any(step.startswith(f"SEARCH {table} USING COVERING INDEX") for step in plan), plan
+
+
+def test_display_names_are_backfilled_from_the_normalized_name(database):
+    with database.begin() as conn:
+        conn.execute(text("ALTER TABLE recipe_ingredients DROP COLUMN display_name"))
+        conn.execute(text("DELETE FROM schema_version WHERE version >= 8"))
+        user_id = conn.execute(text(
+            "INSERT INTO users (email, username, hashed_password) VALUES ('a@example.com', 'a', 'x') RETURNING id"
+        )).scalar()
+        recipe_id = conn.execute(text(
+            "INSERT INTO recipes (name, instructions, servings, user_id, row_version) "
+            "VALUES ('Soup', 'Cook.', 2, :user_id, 1) RETURNING id"
+        ), {"user_id": user_id}).scalar()
+        conn.execute(text(
+            "INSERT INTO recipe_ingredients (recipe_id, position, name) VALUES (:recipe_id, 0, 'tomato')"
+        ), {"recipe_id": recipe_id})
+
+    upgrade(database)
+
+    with database.connect() as conn:
+        assert conn.execute(select(models.RecipeIngredient.display_name)).scalars().all() == ["tomato"]
@@ -0,0 +1,29 @@
+from app import pagination
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+
+
+def test_unpaged_requests_return_everything(client, user, monkeypatch):
+    _, headers = user
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+    for number in range(5):
+        client.post("/ingredients/", json={**TOMATO, "name": f"Tomato {number}"}, headers=headers)
+
+    response = client.get("/ingredients/", headers=headers)
+    assert len(response.json()) == 5
+    assert pagination.NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_limit_and_cursor_page_through(client, user, monkeypatch):
+    _, headers = user
+    monkeypatch.setattr(pagination, "DEFAULT_PAGE_SIZE", 2)
+    for number in range(5):
+        client.post("/ingredients/", json={**TOMATO, "name": f"Tomato {number}"}, headers=headers)
+
+    first = client.get("/ingredients/", params={"limit": 3}, headers=headers)
+    assert [row["name"] for row in first.json()] == ["Tomato 0", "Tomato 1", "Tomato 2"]
+
+    cursor = first.headers[pagination.NEXT_CURSOR_HEADER]
+    second = client.get("/ingredients/", params={"cursor": cursor}, headers=headers)
+    assert [row["name"] for row in second.json()] == ["Tomato 3", "Tomato 4"]
+    assert pagination.NEXT_CURSOR_HEADER not in second.headers
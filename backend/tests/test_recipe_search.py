@@ -0,0 +1,51 @@
+from app.recipe_search import RecipeSearchIndex, ingredient_terms, tokenize
+
+
+def _index(*recipes) -> RecipeSearchIndex:
+    index = RecipeSearchIndex()
+    for recipe_id, name, description, ingredients in recipes:
+        index._add(recipe_id, name, description, ingredients)
+    return index
+
+
+def test_tokens_and_ingredient_terms_drop_simple_plurals():
+    assert tokenize("Tomatoes, Glasses & Peppers") == ["tomato", "glass", "pepper"]
+    assert ingredient_terms("Cherry  Tomatoes") == ["cherry tomatoes", "cherry", "tomatoes", "cherry tomato", "tomato"]
+
+
+def test_name_hits_outrank_ingredient_and_description_hits():
+    index = _index(
+        (1, "Garden salad", "Goes well with tomato soup", ["lettuce"]),
+        (2, "Bruschetta", "Toasted bread", ["tomato", "basil"]),
+        (3, "Tomato soup", "Warming", ["tomato"]),
+        (4, "Pancakes", "Sweet", ["flour"]),
+    )
+    assert index.search("tomato", 0, 10) == [3, 2, 1]
+    assert index.search("tomatoes", 0, 10) == [3, 2, 1]
+
+
+def test_names_match_despite_typos():
+    index = _index(
+        (1, "Chicken curry", None, ["chicken"]),
+        (2, "Lemon tart", None, ["lemon"]),
+    )
+    assert index.search("chiken cury", 0, 10) == [1]
+    assert index.search("zzz", 0, 10) == []
+
+
+def test_search_pages_through_the_ranking(client, user):
+    _, headers = user
+    for name in ("Tomato soup", "Tomato salad", "Tomato tart", "Apple pie"):
+        client.post("/recipes/", headers=headers, json={
+            "name": name, "instructions": "Cook.", "ingredients": '["Tomato"]' if "Tomato" in name else '["Apple"]',
+        })
+
+    ranking = [recipe["name"] for recipe in client.get("/recipes/search", params={"q": "tomato"}).json()]
+    assert sorted(ranking) == ["Tomato salad", "Tomato soup", "Tomato tart"]
+
+    first = client.get("/recipes/search", params={"q": "tomato", "limit": 2})
+    assert [recipe["name"] for recipe in first.json()] == ranking[:2]
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/recipes/search", params={"q": "tomato", "limit": 2, "cursor": cursor})
+    assert [recipe["name"] for recipe in second.json()] == ranking[2:]
+    assert "X-Next-Cursor" not in second.headers
@@ -0,0 +1,150 @@
+from sqlalchemy import delete
+
+from app import models
+from app.database import SessionLocal
+from app.recipe_index import RecipeIndex, recipe_index
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+
+
+def _insert_recipe(user_id: int, name: str, ingredient_names) -> int:
+    """Write a recipe the way another process (importer, seed_data) would"""
+    with SessionLocal() as db:
+        recipe = models.Recipe(name=name, instructions="Cook.", user_id=user_id)
+        recipe.set_ingredients([{"name": ingredient_name} for ingredient_name in ingredient_names])
+        db.add(recipe)
+        db.commit()
+        return recipe.id
+
+
+def _matching_ids(client, headers):
+    response = client.get("/recipes/match/ingredients", headers=headers)
+    assert response.status_code == 200
+    return [recipe["id"] for recipe in response.json()]
+
+
+def test_indexes_pick_up_recipes_written_by_other_processes(client, user):
+    user_id, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    first = _insert_recipe(user_id, "Tomato soup", ["tomato"])
+    assert _matching_ids(client, headers) == [first]
+    assert [recipe["id"] for recipe in client.get("/recipes/search", params={"q": "salad"}).json()] == []
+
+    second = _insert_recipe(user_id, "Tomato salad", ["tomato"])
+    assert _matching_ids(client, headers) == [first, second]
+    assert [recipe["id"] for recipe in client.get("/recipes/search", params={"q": "salad"}).json()] == [second]
+
+    with SessionLocal() as db:
+        db.execute(delete(models.RecipeIngredient).where(models.RecipeIngredient.recipe_id == first))
+        db.execute(delete(models.Recipe).where(models.Recipe.id == first))
+        db.add(models.Tombstone(table_name="recipes", row_id=first, user_id=user_id))
+        db.commit()
+    assert _matching_ids(client, headers) == [second]
+
+
+def test_matching_uses_only_the_current_users_pantry(client, user, other_user):
+    user_id, headers = user
+    _, other_headers = other_user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    recipe_id = _insert_recipe(user_id, "Tomato soup", ["tomato"])
+
+    assert _matching_ids(client, headers) == [recipe_id]
+    assert _matching_ids(client, other_headers) == []
+
+    ranked = client.get("/recipes/match/ranked", headers=headers).json()
+    assert [match["recipe"]["id"] for match in ranked] == [recipe_id]
+    assert client.get("/recipes/match/ranked", headers=other_headers).json() == []
+    assert client.get("/recipes/match/ranked").status_code == 401
+
+
+def test_indexes_apply_only_what_changed_after_the_first_load(client, user, monkeypatch):
+    user_id, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    first = _insert_recipe(user_id, "Tomato soup", ["tomato"])
+    assert _matching_ids(client, headers) == [first]
+
+    fetched = []
+    fetch = recipe_index._fetch
+
+    async def recording_fetch(db, conditions):
+        recipes = await fetch(db, conditions)
+        fetched.append([recipe_id for recipe_id, _ in recipes])
+        return recipes
+
+    monkeypatch.setattr(recipe_index, "_fetch", recording_fetch)
+    created = client.post(
+        "/recipes/", json={"name": "Tomato toast", "instructions": "Toast.", "ingredients": '["Tomato"]'},
+        headers=headers,
+    ).json()["id"]
+    other = _insert_recipe(user_id, "Tomato salad", ["tomato"])
+    assert _matching_ids(client, headers) == [first, created, other]
+    assert fetched == [[created, other]]
+
+    assert client.delete(f"/recipes/{created}", headers=headers).status_code == 200
+    assert _matching_ids(client, headers) == [first, other]
+    assert fetched == [[created, other], []]
+
+
+def test_matching_counts_only_the_pantrys_postings():
+    index = RecipeIndex()
+    index._add(1, ["tomato", "basil"])
+    index._add(2, ["tomato"])
+    index._add(3, [])
+    index._add(4, ["rice"])
+    assert index.match({"tomato"}) == [2, 3]
+    assert index.match({"tomato", "basil", "salt"}) == [1, 2, 3]
+
+    index._remove(2)
+    index._add(2, ["rice"])
+    assert index.match({"tomato"}) == [3]
+    assert index.match({"rice"}) == [2, 3, 4]
+
+
+def test_ranking_orders_by_coverage_then_missing_then_expiring():
+    index = RecipeIndex()
+    index._add(1, ["tomato", "basil", "garlic", "onion"])
+    index._add(2, ["tomato", "basil"])
+    index._add(3, ["tomato", "rice"])
+    index._add(4, ["basil", "lemon"])
+    index._add(5, ["rice"])
+
+    ranked = index.rank({"tomato", "basil"}, expiring_names={"basil", "lemon"})
+    assert [match.recipe_id for match in ranked] == [2, 4, 3, 1]
+    assert ranked[1] == (4, 0.5, 1, 1, 1, ["lemon"])
+    assert ranked[3].missing_ingredients == ["garlic", "onion"]
+
+    assert [match.recipe_id for match in index.rank({"tomato", "basil"}, max_missing=1)] == [2, 3, 4]
+    assert [match.recipe_id for match in index.rank({"tomato", "basil"}, limit=2)] == [2, 3]
+
+
+def test_only_the_owner_can_read_or_delete_a_recipe(client, user, other_user):
+    user_id, headers = user
+    _, other_headers = other_user
+    recipe_id = _insert_recipe(user_id, "Tomato soup", ["tomato"])
+
+    assert client.get(f"/recipes/{recipe_id}").status_code == 401
+    assert client.delete(f"/recipes/{recipe_id}").status_code == 401
+    assert client.get(f"/recipes/{recipe_id}", headers=other_headers).status_code == 404
+    assert client.delete(f"/recipes/{recipe_id}", headers=other_headers).status_code == 404
+
+    assert client.get(f"/recipes/{recipe_id}", headers=headers).json()["name"] == "Tomato soup"
+    assert client.delete(f"/recipes/{recipe_id}", headers=headers).status_code == 200
+    assert client.get(f"/recipes/{recipe_id}", headers=headers).status_code == 404
+
+
+def test_ingredient_names_round_trip_as_written(client, user):
+    _, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    created = client.post("/recipes/", headers=headers, json={
+        "name": "Caprese", "instructions": "Slice.", "ingredients": '["Tomato", "Fresh  Basil"]',
+    }).json()
+    assert created["ingredients"] == '["Tomato", "Fresh Basil"]'
+    assert [item["name"] for item in created["ingredient_items"]] == ["Tomato", "Fresh Basil"]
+
+    listed = client.get("/recipes/").json()[0]
+    assert [item["name"] for item in listed["ingredient_items"]] == ["Tomato", "Fresh Basil"]
+    assert client.get(f"/recipes/{created['id']}", headers=headers).json()["ingredients"] == created["ingredients"]
+
+    # Matching still goes by the normalized name
+    ranked = client.get("/recipes/match/ranked", headers=headers).json()
+    assert ranked[0]["missing_ingredients"] == ["fresh basil"]
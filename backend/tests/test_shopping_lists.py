@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import models
+from app.database import SessionLocal, async_engine
+
+
+@contextmanager
+def count_queries():
+    """Count statements the API runs through the async engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _create_lists(client, headers, count: int, items_per_list: int = 3):
+    for number in range(count):
+        list_id = client.post("/shopping-lists/", json={"name": f"List {number}"}, headers=headers).json()["id"]
+        client.post(f"/shopping-lists/{list_id}/items/bulk", headers=headers, json={"items": [
+            {"item_name": f"item {number}-{item}", "quantity": 1, "unit": "pieces"} for item in range(items_per_list)
+        ]})
+
+
+def _listing_queries(client, headers):
+    with count_queries() as statements:
+        response = client.get("/shopping-lists/", headers=headers)
+    assert response.status_code == 200
+    return len(statements), response.json()
+
+
+def test_listing_query_count_does_not_grow_with_lists(client, user):
+    _, headers = user
+    _create_lists(client, headers, 1)
+    few_queries, lists = _listing_queries(client, headers)
+    assert len(lists) == 1
+
+    _create_lists(client, headers, 9)
+    many_queries, lists = _listing_queries(client, headers)
+    assert len(lists) == 10
+    assert all(len(shopping_list["items"]) == 3 for shopping_list in lists)
+    assert many_queries == few_queries
+
+
+def _insert_recipe(user_id: int, ingredients) -> int:
+    with SessionLocal() as db:
+        recipe = models.Recipe(name="Pasta", instructions="Boil.", user_id=user_id)
+        recipe.set_ingredients(ingredients)
+        db.add(recipe)
+        db.commit()
+        return recipe.id
+
+
+def test_list_from_recipes_subtracts_stock(client, user):
+    user_id, headers = user
+    recipe_id = _insert_recipe(user_id, [
+        {"name": "Salt"},
+        {"name": "Olive oil"},
+        {"name": "Pasta", "quantity": 500, "unit": "g"},
+        {"name": "Basil", "quantity": 1, "unit": "bunch"},
+    ])
+    for name, quantity, unit in (("Salt", 1, "kg"), ("  olive  OIL ", 0.5, "L"), ("PASTA", 0.2, "kg")):
+        client.post("/ingredients/", headers=headers, json={
+            "name": name, "category": "Pantry", "location": "Pantry", "quantity": quantity, "unit": unit,
+        })
+
+    response = client.post("/shopping-lists/from-recipes", headers=headers, json={
+        "recipes": [{"recipe_id": recipe_id, "servings_multiplier": 2}],
+    })
+    assert response.status_code == 200, response.text
+    items = {item["item_name"]: (item["quantity"], item["unit"]) for item in response.json()["items"]}
+    assert items == {"basil": (2, "bunch"), "pasta": (0.8, "kg")}
+
+
+def _list_with_items(client, headers):
+    list_id = client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+    items = client.post(f"/shopping-lists/{list_id}/items/bulk", headers=headers, json={"items": [
+        {"item_name": "milk", "quantity": 1, "unit": "L"},
+        {"item_name": "eggs", "quantity": 6, "unit": "pieces"},
+    ]}).json()
+    return list_id, [item["id"] for item in items]
+
+
+def test_list_endpoints_require_a_token(client, user):
+    _, headers = user
+    list_id, item_ids = _list_with_items(client, headers)
+    for method, path, body in (
+        ("GET", "/shopping-lists/", None),
+        ("POST", f"/shopping-lists/{list_id}/items", {"item_name": "tea", "quantity": 1, "unit": "box"}),
+        ("POST", f"/shopping-lists/{list_id}/items/bulk", {"items": [{"item_name": "tea", "quantity": 1, "unit": "box"}]}),
+        ("PUT", "/shopping-lists/items/purchase", {"item_ids": item_ids, "is_purchased": True}),
+        ("PUT", f"/shopping-lists/items/{item_ids[0]}?is_purchased=true", None),
+        ("DELETE", f"/shopping-lists/items/{item_ids[0]}", None),
+        ("DELETE", f"/shopping-lists/{list_id}", None),
+    ):
+        assert client.request(method, path, json=body).status_code == 401, path
+
+
+def test_other_users_cannot_touch_a_list(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    list_id, item_ids = _list_with_items(client, headers)
+
+    assert client.get("/shopping-lists/", headers=other_headers).json() == []
+    item = {"item_name": "tea", "quantity": 1, "unit": "box"}
+    assert client.post(f"/shopping-lists/{list_id}/items", json=item, headers=other_headers).status_code == 404
+    assert client.post(
+        f"/shopping-lists/{list_id}/items/bulk", json={"items": [item]}, headers=other_headers
+    ).status_code == 404
+    toggled = client.put(
+        "/shopping-lists/items/purchase", json={"item_ids": item_ids, "is_purchased": True}, headers=other_headers
+    )
+    assert toggled.json() == []
+    assert client.put(
+        f"/shopping-lists/items/{item_ids[0]}", params={"is_purchased": True}, headers=other_headers
+    ).status_code == 404
+    assert client.delete(f"/shopping-lists/items/{item_ids[0]}", headers=other_headers).status_code == 404
+    assert client.delete(f"/shopping-lists/{list_id}", headers=other_headers).status_code == 404
+
+    (shopping_list,) = client.get("/shopping-lists/", headers=headers).json()
+    assert [(item["item_name"], item["is_purchased"]) for item in shopping_list["items"]] == [
+        ("milk", False), ("eggs", False),
+    ]
+
+
+def test_bulk_add_and_batch_purchase(client, user):
+    _, headers = user
+    list_id, item_ids = _list_with_items(client, headers)
+    toggled = client.put(
+        "/shopping-lists/items/purchase", json={"item_ids": item_ids + [999], "is_purchased": True}, headers=headers
+    ).json()
+    assert sorted(item["id"] for item in toggled) == item_ids
+    assert all(item["is_purchased"] for item in toggled)
@@ -0,0 +1,77 @@
+from sqlalchemy import text
+
+from app.database import engine
+
+TOMATO = {"name": "Tomato", "category": "Vegetables", "location": "Fridge", "quantity": 4, "unit": "pieces"}
+FLOUR = {"name": "Flour", "category": "Baking", "location": "Pantry", "quantity": 1, "unit": "kg"}
+
+
+def _settle():
+    """Stamp every change as long past, as if SYNC_SETTLE_SECONDS had gone by"""
+    with engine.begin() as conn:
+        for table in ("ingredients", "recipes", "shopping_items"):
+            conn.execute(text(f"UPDATE {table} SET updated_at = '2000-01-01 00:00:00.000000'"))
+        conn.execute(text("UPDATE tombstones SET deleted_at = '2000-01-01 00:00:00.000000'"))
+
+
+def _sync(client, headers, since=0, **params):
+    response = client.get("/sync", params={"since": since, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_sync_returns_changes_and_tombstones_since_the_token(client, user, other_user):
+    _, headers = user
+    _, other_headers = other_user
+    tomato = client.post("/ingredients/", json=TOMATO, headers=headers).json()
+    client.post("/ingredients/", json=FLOUR, headers=other_headers)
+    list_id = client.post("/shopping-lists/", json={"name": "Weekly"}, headers=headers).json()["id"]
+    item = client.post(f"/shopping-lists/{list_id}/items", headers=headers,
+                       json={"item_name": "milk", "quantity": 1, "unit": "L"}).json()
+    _settle()
+
+    first = _sync(client, headers)
+    assert [row["name"] for row in first["ingredients"]] == ["Tomato"]
+    assert [row["id"] for row in first["shopping_items"]] == [item["id"]]
+    assert first["deleted"] == [] and not first["has_more"]
+    assert first["token"] == max(row["row_version"] for row in first["ingredients"] + first["shopping_items"])
+    assert _sync(client, headers, first["token"])["ingredients"] == []
+
+    client.delete(f"/ingredients/{tomato['id']}", headers=headers)
+    _settle()
+    second = _sync(client, headers, first["token"])
+    assert second["ingredients"] == []
+    assert [(row["table"], row["id"]) for row in second["deleted"]] == [("ingredients", tomato["id"])]
+    assert second["token"] == second["deleted"][0]["row_version"]
+    assert _sync(client, other_headers, first["token"])["deleted"] == []
+
+
+def test_token_stays_put_until_changes_settle(client, user):
+    _, headers = user
+    client.post("/ingredients/", json=TOMATO, headers=headers)
+    _settle()
+    settled = _sync(client, headers)["token"]
+
+    client.post("/ingredients/", json=FLOUR, headers=headers)
+    pending = _sync(client, headers, settled)
+    assert [row["name"] for row in pending["ingredients"]] == ["Flour"]
+    assert pending["token"] == settled
+
+    _settle()
+    assert _sync(client, headers, settled)["token"] == pending["ingredients"][0]["row_version"]
+
+
+def test_pages_only_advance_through_settled_changes(client, user):
+    _, headers = user
+    for number in range(3):
+        client.post("/ingredients/", json={**TOMATO, "name": f"Tomato {number}"}, headers=headers)
+    _settle()
+    client.post("/ingredients/", json=FLOUR, headers=headers)
+
+    page = _sync(client, headers, limit=2)
+    assert [row["name"] for row in page["ingredients"]] == ["Tomato 0", "Tomato 1"]
+    assert page["has_more"]
+    rest = _sync(client, headers, page["token"], limit=2)
+    assert [row["name"] for row in rest["ingredients"]] == ["Tomato 2", "Flour"]
+    assert rest["token"] == rest["ingredients"][0]["row_version"]
+    assert not rest["has_more"]